@@ -1641,7 +1641,14 @@ def run_generation_logic(doc_type: str, data: dict, model: str):
             generator = UnifiedGenerator()
             # Progress bar for unified generation
             progress_bar = st.progress(0, text="Iniciando generación paralela de 5 documentos...")
-            result = generator.generate_all(data, model)
+            done = 0
+            for result in generator.generate_all_stream(data, model):
+                if "type" in result:
+                    done += 1
+                    progress_bar.progress(
+                        done * 20,
+                        text=f"{result['type'].replace('_', ' ').title()} listo ({done}/5)"
+                    )
             progress_bar.progress(100, text="Generación Completada!")
             return result
         else:
@@ -1980,14 +1987,13 @@ def main():
                         
                         # Unified ZIP Download
                         if result.get("zip_file"):
-                            with open(result["zip_file"], "rb") as f:
-                                st.download_button(
-                                    label="⬇️ Descargar TODOS los Documentos (ZIP)",
-                                    data=f,
-                                    file_name=os.path.basename(result["zip_file"]),
-                                    mime="application/zip",
-                                    key="unified_download"
-                                )
+                            st.download_button(
+                                label="⬇️ Descargar TODOS los Documentos (ZIP)",
+                                data=result["zip_data"],
+                                file_name=os.path.basename(result["zip_file"]),
+                                mime="application/zip",
+                                key="unified_download"
+                            )
                     else:
                         st.error("❌ Ocurrió un error al generar los documentos.")
                         if "error" in result:
@@ -5,6 +5,9 @@ Supports both .env (local) and st.secrets (Streamlit Cloud)
 """
 
 import os
+import threading
+from concurrent.futures import CancelledError
+from functools import lru_cache
 from dotenv import load_dotenv
 
 # Load .env for local development
@@ -84,6 +87,9 @@ GROQ_API_KEY = get_secret("GROQ_API_KEY")
 # --- Database ---
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "database", "mga_agent.db")
 
+# Recent per-document generation times, used to order the generators
+LATENCY_PATH = os.path.join(os.path.dirname(__file__), "database", "latency.json")
+
 # --- App Settings ---
 APP_TITLE = "Agente IA para Proyectos MGA"
 APP_DESCRIPTION = "Herramienta de apoyo para formulación de proyectos públicos en la plataforma MGA del DNP"
@@ -111,6 +117,31 @@ def get_available_providers():
     return available
 
 
+# --- LLM Request Limits ---
+# LLM requests in flight at once across all generators; Groq's tokens-per-minute
+# limit is exceeded when several multi-thousand-token prompts are sent together
+LLM_MAX_CONCURRENT_REQUESTS = 2
+# Retries per request on rate limits and server errors; the provider SDKs back
+# off exponentially between attempts and honour the Retry-After header
+LLM_MAX_RETRIES = 6
+
+_llm_request_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENT_REQUESTS)
+
+
+def invoke_llm(chain, inputs, cancelled: threading.Event = None):
+    """
+    Invoke an LLM chain once one of the shared request slots is free.
+    If `cancelled` is set by then, raise CancelledError instead of sending it.
+    """
+    with _llm_request_slots:
+        if cancelled is not None and cancelled.is_set():
+            raise CancelledError()
+        return chain.invoke(inputs)
+
+
+# Clients are reused per provider: they hold no per-request state, and building
+# one sets up its HTTP client. Failed initializations are not cached.
+@lru_cache(maxsize=8)
 def get_llm(provider: str = None):
     """Get LLM instance for the specified provider"""
     provider = provider or DEFAULT_PROVIDER
@@ -122,6 +153,7 @@ def get_llm(provider: str = None):
             api_key=GROQ_API_KEY,
             base_url="https://api.groq.com/openai/v1",
             temperature=0.3,
+            max_retries=LLM_MAX_RETRIES,
         )
     elif provider == "groq_llama":
         from langchain_openai import ChatOpenAI
@@ -130,6 +162,7 @@ def get_llm(provider: str = None):
             api_key=GROQ_API_KEY,
             base_url="https://api.groq.com/openai/v1",
             temperature=0.1,  # Lower temp for extraction accuracy
+            max_retries=LLM_MAX_RETRIES,
         )
     elif provider == "gemini":
         from langchain_google_genai import ChatGoogleGenerativeAI
@@ -137,6 +170,7 @@ def get_llm(provider: str = None):
             model=LLM_PROVIDERS["gemini"]["model"],
             google_api_key=GOOGLE_API_KEY,
             temperature=0.3,
+            max_retries=LLM_MAX_RETRIES,
         )
     elif provider == "gemini_flash":
         from langchain_google_genai import ChatGoogleGenerativeAI
@@ -144,6 +178,7 @@ def get_llm(provider: str = None):
             model=LLM_PROVIDERS["gemini_flash"]["model"],
             google_api_key=GOOGLE_API_KEY,
             temperature=0.1,  # Lower temp for extraction
+            max_retries=LLM_MAX_RETRIES,
         )
     elif provider == "openai":
         from langchain_openai import ChatOpenAI
@@ -151,6 +186,7 @@ def get_llm(provider: str = None):
             model=LLM_PROVIDERS["openai"]["model"],
             api_key=OPENAI_API_KEY,
             temperature=0.3,
+            max_retries=LLM_MAX_RETRIES,
         )
     elif provider == "anthropic":
         from langchain_anthropic import ChatAnthropic
@@ -158,6 +194,7 @@ def get_llm(provider: str = None):
             model=LLM_PROVIDERS["anthropic"]["model"],
             api_key=ANTHROPIC_API_KEY,
             temperature=0.3,
+            max_retries=LLM_MAX_RETRIES,
         )
     else:
         raise ValueError(f"Unknown provider: {provider}")
@@ -190,6 +190,7 @@ class MGAEditor:
         
         from langchain_core.prompts import ChatPromptTemplate
         from langchain_core.output_parsers import StrOutputParser
+        from config import invoke_llm
         
         # Prepare document text (focus on target pages if specified)
         if target_pages and doc_content.get("pages"):
@@ -242,7 +243,7 @@ Genera las ediciones necesarias en formato JSON.""")
         
         try:
             chain = prompt | self.llm | StrOutputParser()
-            response = chain.invoke({
+            response = invoke_llm(chain, {
                 "user_prompt": user_prompt,
                 "doc_text": doc_text
             })
@@ -6,8 +6,15 @@ Extracts project data from PDF, DOCX, and XLSX files to auto-fill forms
 import os
 import json
 import re
-from io import BytesIO
-from typing import Dict, Optional, Any
+import hashlib
+import threading
+import zipfile
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from io import BytesIO, StringIO
+from typing import Dict, List, Optional, Any, Pattern, Tuple, Union
+
+from config import invoke_llm
 
 # PDF parsing
 try:
@@ -26,6 +33,29 @@ try:
 except ImportError:
     Document = None
 
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# LLM prompt building (only needed for AI extraction)
+try:
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+except ImportError:
+    ChatPromptTemplate = None
+    StrOutputParser = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    from pydantic import create_model
+except ImportError:
+    create_model = None
+
 # XLSX parsing
 try:
     import pandas as pd
@@ -38,6 +68,114 @@ except ImportError:
     openpyxl = None
 
 
+# WordprocessingML namespace and tags used by the direct DOCX XML reader
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P = W_NS + "p"
+W_T = W_NS + "t"
+W_TR = W_NS + "tr"
+W_TC = W_NS + "tc"
+
+# Document to extract: a file path on disk or the raw bytes of an upload
+Source = Union[bytes, str]
+
+
+def _open_pdf(source: Source):
+    """Open a PDF with PyMuPDF from a file path or raw bytes"""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _as_file(source: Source):
+    """Return a file path unchanged, or wrap raw bytes for libraries that expect a file"""
+    return source if isinstance(source, str) else BytesIO(source)
+
+
+# Marks a lazily built attribute that has not been computed yet
+_UNSET = object()
+
+# Character offsets where pattern extraction stops to check whether every
+# field is already resolved (None = rest of the document). Windows are
+# extended to the next line break so no line is split between passes
+PATTERN_SCAN_WINDOWS = (50_000, 200_000, None)
+
+# Token budget for the document text sent to the LLM, split between the
+# beginning, middle and end of long documents to get data from all pages
+AI_CONTEXT_TOKENS = 4000
+AI_CONTEXT_SPLIT = (0.4, 0.4, 0.2)
+# Estimate used when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+# Lines repeated more often than this (page headers/footers) are kept only once
+BOILERPLATE_MIN_REPEATS = 3
+
+HORIZONTAL_SPACE_RE = re.compile(r'[ \t\f\v\u00a0]+')
+DOT_LEADER_RE = re.compile(r'\.{4,}')
+# Separator written between PDF pages (form feed, as pdftotext does)
+PAGE_BREAK = "\n\f"
+# Labelled page numbers ("Pág 3", "Página 3 de 12") are dropped wherever they are
+PAGE_LABEL_RE = re.compile(r'p[áa]g(?:ina)?\.?\s*\d{1,4}(?:\s*(?:de|/)\s*\d{1,4})?', re.IGNORECASE)
+# Bare page numbers ("7", "3 de 12", "3/12") only as the first or last line of a
+# page: elsewhere a short number is data (a duration, a beneficiary count)
+PAGE_NUMBER_RE = re.compile(r'\d{1,4}(?:\s*(?:de|/)\s*\d{1,4})?')
+
+# Comprehensive field list requested from the LLM for all document types (unified)
+AI_EXTRACTION_FIELDS = (
+    "municipio", "departamento", "entidad", "bpin", "nombre_proyecto",
+    "valor_total", "duracion", "responsable", "cargo", "alcalde",
+    "objeto", "necesidad", "alcance", "modalidad", "fuente_financiacion",
+    "sector", "codigo_ciiu", "codigos_unspsc", "programa", "subprograma",
+    "plan_nacional", "plan_departamental", "plan_municipal",
+    "poblacion_beneficiada", "indicador_producto", "meta_producto",
+    "es_actualizacion",
+)
+
+# Schema for structured (JSON-mode) LLM output; every field is optional
+# because the model must omit values it cannot find
+ExtractedProjectData = create_model(
+    "ExtractedProjectData",
+    **{field: (Optional[str], None) for field in AI_EXTRACTION_FIELDS}
+) if create_model else None
+
+# LLM answers that mean "no value" and must not be used to fill a field
+PLACEHOLDER_PHRASES = frozenset({
+    "valor extraído", "no encontrado", "no disponible",
+    "n/a", "por definir", "pendiente", "null"
+})
+JSON_DECODER = json.JSONDecoder()
+LEADING_SEPARATORS_RE = re.compile(r'^[:\-\s]+')
+NUMBER_FORMATTING_RE = re.compile(r'[\$\.,\s]')
+DIGITS_RE = re.compile(r'\d+')
+
+# Extracted text keyed by (file kind, content hash), or by path and
+# modification time for files on disk. Streamlit reruns the script on
+# every interaction, so the same upload is otherwise re-parsed
+TEXT_CACHE_SIZE = 32
+_text_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+
+def _cached_text(kind: str, source: Source, extract) -> str:
+    """Return extract(source), memoized by content digest (bytes) or path and mtime (files)"""
+    if isinstance(source, str):
+        stat = os.stat(source)
+        key = (kind, source, stat.st_mtime_ns, stat.st_size)
+    else:
+        key = (kind, hashlib.blake2b(source, digest_size=16).digest())
+    with _text_cache_lock:
+        if key in _text_cache:
+            _text_cache.move_to_end(key)
+            return _text_cache[key]
+    
+    text = extract(source)
+    
+    with _text_cache_lock:
+        _text_cache[key] = text
+        while len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    return text
+
+
 class DocumentDataExtractor:
     """Extract data from uploaded documents to fill forms"""
     
@@ -91,13 +229,16 @@ class DocumentDataExtractor:
     def __init__(self, llm=None):
         """Initialize extractor with optional LLM for AI extraction"""
         self.llm = llm
+        # LLM chains are built on first use and reused for later extractions
+        self._text_chain = None
+        self._structured_chain = _UNSET
     
     def extract_from_file(self, file, file_type: str, doc_type: str, user_context: str = "") -> Dict[str, Any]:
         """
         Extract data from uploaded file
         
         Args:
-            file: Uploaded file object (Streamlit UploadedFile)
+            file: Uploaded file object (Streamlit UploadedFile) or path to a file on disk
             file_type: Extension (.pdf, .docx, .xlsx)
             doc_type: Document type (estudios_previos, mga_subsidios, etc.)
             user_context: Optional user-provided context for extraction
@@ -105,21 +246,21 @@ class DocumentDataExtractor:
         Returns:
             Dictionary with extracted field values
         """
-        # Read file content
+        # Files on disk are opened by path so each library reads them
+        # directly; only in-memory uploads are read into bytes
         if hasattr(file, 'read'):
-            content = file.read()
+            source = file.read()
             file.seek(0)  # Reset for potential re-read
         else:
-            with open(file, 'rb') as f:
-                content = f.read()
+            source = os.fspath(file)
         
         # Extract text based on file type
         if file_type.lower() in ['.pdf', 'pdf']:
-            text = self._extract_pdf_text(content)
+            text = _cached_text("pdf", source, self._extract_pdf_text)
         elif file_type.lower() in ['.docx', 'docx']:
-            text = self._extract_docx_text(content)
+            text = _cached_text("docx", source, self._extract_docx_text)
         elif file_type.lower() in ['.xlsx', 'xlsx', '.xls', 'xls']:
-            text = self._extract_xlsx_text(content)
+            text = _cached_text("xlsx", source, self._extract_xlsx_text)
         else:
             return {"error": f"Unsupported file type: {file_type}"}
         
@@ -139,144 +280,189 @@ class DocumentDataExtractor:
         
         return result
     
-    def _extract_pdf_text(self, content: bytes) -> str:
-        """Extract text from PDF"""
-        text_parts = []
-        
+    def _extract_pdf_text(self, source: Source) -> str:
+        """Extract text from PDF, pages separated by PAGE_BREAK"""
         # Try PyMuPDF first (faster)
         if fitz:
             try:
-                doc = fitz.open(stream=content, filetype="pdf")
+                buf = StringIO()
+                doc = _open_pdf(source)
                 for page in doc:
-                    text_parts.append(page.get_text())
+                    buf.write(page.get_text())
+                    buf.write(PAGE_BREAK)
                 doc.close()
-                return "\n".join(text_parts)
+                return buf.getvalue().rstrip(PAGE_BREAK)
             except Exception as e:
                 print(f"PyMuPDF error: {e}")
         
         # Fall back to pdfplumber
         if pdfplumber:
             try:
-                with pdfplumber.open(BytesIO(content)) as pdf:
+                buf = StringIO()
+                with pdfplumber.open(_as_file(source)) as pdf:
                     for page in pdf.pages:
                         text = page.extract_text()
                         if text:
-                            text_parts.append(text)
-                return "\n".join(text_parts)
+                            buf.write(text)
+                            buf.write(PAGE_BREAK)
+                return buf.getvalue().rstrip(PAGE_BREAK)
             except Exception as e:
                 print(f"pdfplumber error: {e}")
         
         return ""
     
-    def _extract_docx_text(self, content: bytes) -> str:
+    def _extract_docx_text(self, source: Source) -> str:
         """Extract text from DOCX"""
+        # Read word/document.xml directly; python-docx is only the fallback
+        if etree is not None:
+            try:
+                return self._extract_docx_xml_text(source)
+            except Exception as e:
+                print(f"DOCX XML parse error: {e}")
+        
         if not Document:
             return ""
         
         try:
-            doc = Document(BytesIO(content))
-            text_parts = []
+            doc = Document(_as_file(source))
+            buf = StringIO()
             
             for para in doc.paragraphs:
                 if para.text.strip():
-                    text_parts.append(para.text)
+                    buf.write(para.text)
+                    buf.write("\n")
             
             # Also extract from tables
             for table in doc.tables:
                 for row in table.rows:
                     row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
                     if row_text:
-                        text_parts.append(" | ".join(row_text))
+                        buf.write(" | ".join(row_text))
+                        buf.write("\n")
             
-            return "\n".join(text_parts)
+            return buf.getvalue().rstrip("\n")
         except Exception as e:
             print(f"DOCX extraction error: {e}")
             return ""
     
-    def _extract_xlsx_text(self, content: bytes) -> str:
+    def _extract_docx_xml_text(self, source: Source) -> str:
+        """
+        Extract DOCX text by streaming word/document.xml with lxml iterparse.
+        
+        Body paragraphs are emitted one per line and table rows as
+        "cell | cell", skipping empty entries like the python-docx path.
+        """
+        buf = StringIO()
+        with zipfile.ZipFile(_as_file(source)) as z:
+            with z.open("word/document.xml") as f:
+                for _, el in etree.iterparse(f, events=("end",), tag=(W_P, W_TR)):
+                    if el.tag == W_TR:
+                        if any(a.tag == W_TC for a in el.iterancestors()):
+                            continue  # Nested table, handled by the outer row
+                        row_text = []
+                        for cell in el.iterchildren(W_TC):
+                            cell_text = "\n".join(
+                                "".join(t.text or "" for t in p.iter(W_T))
+                                for p in cell.iterchildren(W_P)
+                            ).strip()
+                            if cell_text:
+                                row_text.append(cell_text)
+                        if row_text:
+                            buf.write(" | ".join(row_text))
+                            buf.write("\n")
+                        el.clear()
+                    elif not any(a.tag == W_TC for a in el.iterancestors()):
+                        para_text = "".join(t.text or "" for t in el.iter(W_T))
+                        if para_text.strip():
+                            buf.write(para_text)
+                            buf.write("\n")
+                        el.clear()
+        return buf.getvalue().rstrip("\n")
+    
+    def _extract_xlsx_text(self, source: Source) -> str:
         """Extract text from XLSX"""
-        text_parts = []
+        # openpyxl read-only mode streams rows as plain value tuples
+        # instead of building the full in-memory cell graph
+        if openpyxl:
+            try:
+                wb = openpyxl.load_workbook(_as_file(source), read_only=True, data_only=True, keep_links=False)
+                try:
+                    buf = StringIO()
+                    for sheet in wb.worksheets:
+                        for row in sheet.iter_rows(values_only=True):
+                            row_text = [str(cell) for cell in row if cell is not None]
+                            if row_text:
+                                buf.write(" | ".join(row_text))
+                                buf.write("\n")
+                    return buf.getvalue().rstrip("\n")
+                finally:
+                    wb.close()
+            except Exception as e:
+                print(f"openpyxl error: {e}")
         
+        # Fall back to pandas (e.g. legacy .xls files openpyxl cannot read)
         if pd:
             try:
+                buf = StringIO()
                 # Read all sheets
-                xlsx = pd.ExcelFile(BytesIO(content))
+                xlsx = pd.ExcelFile(_as_file(source))
                 for sheet_name in xlsx.sheet_names:
                     df = pd.read_excel(xlsx, sheet_name=sheet_name)
-                    # Convert to text format
-                    for col in df.columns:
-                        text_parts.append(f"{col}: {df[col].tolist()}")
-                return "\n".join(text_parts)
+                    # Serialize rows with pandas' vectorized CSV writer
+                    df.to_csv(buf, index=False, sep='|', na_rep='', lineterminator='\n')
+                return buf.getvalue().rstrip("\n")
             except Exception as e:
                 print(f"Pandas Excel error: {e}")
         
-        if openpyxl:
-            try:
-                wb = openpyxl.load_workbook(BytesIO(content))
-                for sheet in wb.worksheets:
-                    for row in sheet.iter_rows(values_only=True):
-                        row_text = [str(cell) for cell in row if cell]
-                        if row_text:
-                            text_parts.append(" | ".join(row_text))
-                return "\n".join(text_parts)
-            except Exception as e:
-                print(f"openpyxl error: {e}")
-        
         return ""
     
     def _extract_with_patterns(self, text: str, doc_type: str) -> Dict[str, str]:
         """Extract data using regex patterns and keyword matching"""
         result = {}
-        mappings = self.FIELD_MAPPINGS.get(doc_type, {})
+        mappings = FIELD_PATTERNS.get(doc_type, {})
         
-        lines = text.split('\n')
-        text_lower = text.lower()
+        # Scan growing windows: header fields are usually found in the first
+        # pages, so later windows are only scanned for fields still missing
+        start = 0
+        for limit in PATTERN_SCAN_WINDOWS:
+            end = len(text) if limit is None else text.find('\n', limit)
+            if end == -1:
+                end = len(text)
+            self._match_fields(text[start:end], mappings, result)
+            if len(result) == len(mappings) or end >= len(text):
+                break
+            start = end
         
-        for field_name, keywords in mappings.items():
-            for keyword in keywords:
-                # Try to find keyword followed by colon and value
-                pattern = rf'{keyword}\s*[:\-]?\s*(.+?)(?:\n|$)'
-                match = re.search(pattern, text_lower, re.IGNORECASE)
+        return result
+    
+    def _match_fields(self, text: str, mappings: Dict[str, List[Tuple[str, Pattern]]],
+                      result: Dict[str, str]) -> None:
+        """Fill the fields of `mappings` still missing from `result` with matches found in `text`"""
+        # One scan finds which keywords occur; capture patterns run only for those
+        present = _present_keywords(text)
+        for field_name, patterns in mappings.items():
+            if field_name in result:
+                continue
+            for keyword, pattern in patterns:
+                if keyword not in present:
+                    continue
+                # Keyword followed by colon and value
+                match = pattern.search(text)
                 if match:
                     value = match.group(1).strip()
                     # Clean up the value
-                    value = re.sub(r'^[:\-\s]+', '', value)
+                    value = LEADING_SEPARATORS_RE.sub('', value)
                     if value and len(value) > 1:
                         result[field_name] = value[:500]  # Limit length
                         break
-        
-        return result
     
     def _extract_with_ai(self, text: str, doc_type: str, user_context: str = "") -> Dict[str, str]:
         """Extract data using AI/LLM with improved prompt for better quality"""
-        from langchain_core.prompts import ChatPromptTemplate
-        from langchain_core.output_parsers import StrOutputParser
-        
-        # Comprehensive field list for all document types (unified)
-        all_fields = [
-            "municipio", "departamento", "entidad", "bpin", "nombre_proyecto",
-            "valor_total", "duracion", "responsable", "cargo", "alcalde",
-            "objeto", "necesidad", "alcance", "modalidad", "fuente_financiacion",
-            "sector", "codigo_ciiu", "codigos_unspsc", "programa", "subprograma",
-            "plan_nacional", "plan_departamental", "plan_municipal",
-            "poblacion_beneficiada", "indicador_producto", "meta_producto",
-            "es_actualizacion"
-        ]
+        fields_str = ", ".join(AI_EXTRACTION_FIELDS)
         
-        fields_str = ", ".join(all_fields)
-        
-        # Use MORE text for better extraction (increased from 6000 to 15000)
-        # Also sample from different parts of the document to get data from all pages
-        text_length = len(text)
-        if text_length > 15000:
-            # Smart sampling: take from beginning, middle, and end
-            beginning = text[:6000]
-            middle_start = max(0, (text_length // 2) - 3000)
-            middle = text[middle_start:middle_start + 6000]
-            end = text[-3000:]
-            text_to_analyze = f"{beginning}\n\n[...SECCIÓN INTERMEDIA...]\n\n{middle}\n\n[...SECCIÓN FINAL...]\n\n{end}"
-        else:
-            text_to_analyze = text
+        # Drop whitespace runs and repeated headers/footers, then sample from
+        # the beginning, middle and end within the token budget
+        text_to_analyze = _sample_by_tokens(_compact_text(text), AI_CONTEXT_TOKENS)
         
         # Build context section if provided
         context_section = ""
@@ -291,12 +477,126 @@ NOTA: El usuario ha proporcionado contexto adicional. Si indica que es una ACTUA
 agrega "es_actualizacion": "Si" al JSON. Prioriza la información según las instrucciones del usuario.
 """
         
-        # Build the human message without f-string to avoid brace escaping issues
-        human_message = """Extrae los siguientes campos del documento gubernamental colombiano:
-""" + fields_str + context_section + """
+        # The document is a template variable, so braces in it need no escaping
+        prompt_input = {
+            "fields": fields_str,
+            "context_section": context_section,
+            "document": text_to_analyze,
+        }
+        
+        # Prefer the provider's structured-output mode: the JSON arrives
+        # already validated, so no text parsing is needed
+        structured_chain = self._get_structured_chain()
+        if structured_chain is not None:
+            try:
+                data = invoke_llm(structured_chain, prompt_input)
+                if data is not None:
+                    return self._clean_ai_result(data.model_dump(exclude_none=True))
+            except Exception as e:
+                print(f"Structured AI extraction error, retrying as text: {e}")
+        
+        try:
+            response = invoke_llm(self._get_text_chain(), prompt_input)
+            
+            # Parse the first decodable JSON object in the response. raw_decode
+            # handles nested braces and code fences in a single linear scan
+            start = response.find('{')
+            while start != -1:
+                try:
+                    result, _ = JSON_DECODER.raw_decode(response, start)
+                    return self._clean_ai_result(result)
+                except json.JSONDecodeError:
+                    start = response.find('{', start + 1)
+            
+        except Exception as e:
+            print(f"AI extraction error: {e}")
+        
+        # Fall back to pattern extraction
+        return self._extract_with_patterns(text, doc_type)
+    
+    def _get_text_chain(self):
+        """Prompt | LLM | text parser chain, built once per extractor"""
+        if self._text_chain is None:
+            self._text_chain = _get_extraction_prompt() | self.llm | StrOutputParser()
+        return self._text_chain
+    
+    def _get_structured_chain(self):
+        """Prompt | structured-output LLM chain, or None if the LLM does not support it"""
+        if self._structured_chain is _UNSET:
+            self._structured_chain = None
+            if ExtractedProjectData is not None:
+                try:
+                    structured_llm = self.llm.with_structured_output(ExtractedProjectData)
+                    self._structured_chain = _get_extraction_prompt() | structured_llm
+                except (AttributeError, NotImplementedError):
+                    pass
+        return self._structured_chain
+    
+    def _clean_ai_result(self, result: Dict[str, Any]) -> Dict[str, str]:
+        """Clean and filter the data extracted by the LLM"""
+        cleaned_result = {}
+        for k, v in result.items():
+            if not v or v == "null" or not str(v).strip():
+                continue
+            
+            str_v = str(v).strip()
+            
+            # Skip placeholder values
+            if str_v.lower() in PLACEHOLDER_PHRASES:
+                continue
+            
+            # Clean numeric fields (remove currency symbols and formatting)
+            if k in ["valor_total", "duracion"]:
+                # Remove $, dots, commas, spaces
+                clean_num = NUMBER_FORMATTING_RE.sub('', str_v)
+                # Try to extract just numbers
+                num_match = DIGITS_RE.search(clean_num)
+                if num_match:
+                    str_v = num_match.group(0)
+            
+            cleaned_result[k] = str_v
+        
+        return cleaned_result
+
+
+@lru_cache(maxsize=1)
+def _get_extraction_prompt():
+    """Build the AI extraction prompt template once; the document is a template variable"""
+    return ChatPromptTemplate.from_messages([
+        ("system", """Eres un experto en extracción de datos de documentos MGA colombianos.
+
+REGLA #1 MÁS IMPORTANTE: 
+NUNCA extraigas etiquetas, títulos de sección, o nombres de campos como valores.
+Busca los DATOS REALES que aparecen DESPUÉS de cada etiqueta.
+
+EJEMPLOS DE LO QUE NO DEBES EXTRAER:
+- "01 - Datos básicos del proyecto" → esto es un TÍTULO de sección
+- "Tipología" → esto es una ETIQUETA
+- "Código BPIN" → esto es una ETIQUETA
+- "Formulador Ciudadano:" → esto es una ETIQUETA
+- "valor extraído" → esto es placeholder
+
+EJEMPLOS DE LO QUE SÍ DEBES EXTRAER:
+- El número "202500000011507" que aparece después de "Código BPIN"
+- El nombre "San Pablo" que aparece después de "Municipio"
+- El número "309909217" que aparece después de "Valor Total"
+- El nombre "Roxana Cáceres Quiñonez" que aparece después de "Formulador"
+
+CAMPOS A EXTRAER:
+- bpin: número largo (10+ dígitos) - SOLO NÚMEROS
+- municipio: nombre de ciudad colombiana
+- departamento: nombre de departamento colombiano
+- nombre_proyecto: título descriptivo del proyecto
+- valor_total: cantidad numérica (sin símbolo $)
+- responsable: nombre completo de persona
+- sector: nombre del sector económico
+
+Responde SOLO con JSON válido, sin explicaciones."""),
+        ("human", """Extrae los siguientes campos del documento gubernamental colombiano:
+{fields}{context_section}
 
 ===== DOCUMENTO COMPLETO =====
-""" + text_to_analyze + """
+{document}
 ===== FIN DEL DOCUMENTO =====
 
 ⚠️ REGLAS CRÍTICAS - LEE CUIDADOSAMENTE:
@@ -320,109 +620,129 @@ agrega "es_actualizacion": "Si" al JSON. Prioriza la información según las ins
 6. VALOR_TOTAL es un NÚMERO (ej: 309909217)
    NUNCA extraer "valor total", "presupuesto", u otras etiquetas
 
-Responde con JSON válido. Ejemplo de respuesta CORRECTA:
-{{
-  "municipio": "San Pablo",
-  "departamento": "Bolívar", 
-  "bpin": "202500000011507",
-  "nombre_proyecto": "Apoyo a pequeños productores del municipio",
-  "valor_total": "309909217",
-  "responsable": "Roxana Cáceres Quiñonez",
-  "sector": "Agricultura y desarrollo rural"
-}}
+Responde con JSON válido usando los nombres de campo indicados.
 
-Si no encuentras un valor REAL (no etiquetas), omite ese campo."""
+Si no encuentras un valor REAL (no etiquetas), omite ese campo."""),
+    ])
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", """Eres un experto en extracción de datos de documentos MGA colombianos.
 
-REGLA #1 MÁS IMPORTANTE: 
-NUNCA extraigas etiquetas, títulos de sección, o nombres de campos como valores.
-Busca los DATOS REALES que aparecen DESPUÉS de cada etiqueta.
+def _compact_text(text: str) -> str:
+    """
+    Remove content that costs LLM tokens without carrying data: runs of
+    spaces, dot leaders, blank lines, page numbers and headers/footers
+    repeated on every page.
+    """
+    pages = text.split('\f')
+    lines = []
+    for page in pages:
+        page_lines = []
+        for line in page.split('\n'):
+            line = DOT_LEADER_RE.sub('...', HORIZONTAL_SPACE_RE.sub(' ', line)).strip()
+            if line and not PAGE_LABEL_RE.fullmatch(line):
+                page_lines.append(line)
+        if len(pages) > 1:
+            if page_lines and PAGE_NUMBER_RE.fullmatch(page_lines[-1]):
+                page_lines.pop()
+            if page_lines and PAGE_NUMBER_RE.fullmatch(page_lines[0]):
+                page_lines.pop(0)
+        lines.extend(page_lines)
+    
+    counts = Counter(lines)
+    seen = set()
+    compact = []
+    for line in lines:
+        if counts[line] > BOILERPLATE_MIN_REPEATS:
+            if line in seen:
+                continue
+            seen.add(line)
+        compact.append(line)
+    return '\n'.join(compact)
 
-EJEMPLOS DE LO QUE NO DEBES EXTRAER:
-- "01 - Datos básicos del proyecto" → esto es un TÍTULO de sección
-- "Tipología" → esto es una ETIQUETA
-- "Código BPIN" → esto es una ETIQUETA
-- "Formulador Ciudadano:" → esto es una ETIQUETA
-- "valor extraído" → esto es placeholder
 
-EJEMPLOS DE LO QUE SÍ DEBES EXTRAER:
-- El número "202500000011507" que aparece después de "Código BPIN"
-- El nombre "San Pablo" que aparece después de "Municipio"
-- El número "309909217" que aparece después de "Valor Total"
-- El nombre "Roxana Cáceres Quiñonez" que aparece después de "Formulador"
+@lru_cache(maxsize=1)
+def _get_token_encoding():
+    """Tokenizer used to measure prompt text, or None without tiktoken"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"tiktoken error: {e}")
+        return None
 
-CAMPOS A EXTRAER:
-- bpin: número largo (10+ dígitos) - SOLO NÚMEROS
-- municipio: nombre de ciudad colombiana
-- departamento: nombre de departamento colombiano
-- nombre_proyecto: título descriptivo del proyecto
-- valor_total: cantidad numérica (sin símbolo $)
-- responsable: nombre completo de persona
-- sector: nombre del sector económico
 
-Responde SOLO con JSON válido, sin explicaciones."""),
-            ("human", human_message)
-        ])
-        
-        try:
-            chain = prompt | self.llm | StrOutputParser()
-            response = chain.invoke({})
-            
-            # Parse JSON response - try multiple patterns
-            import json
-            
-            # Try to find JSON in response
-            json_patterns = [
-                r'```json\s*([\s\S]*?)\s*```',  # Code block (try first)
-                r'```\s*([\s\S]*?)\s*```',  # Generic code block
-                r'\{[\s\S]*\}',  # Any JSON object (fallback)
-            ]
-            
-            for pattern in json_patterns:
-                match = re.search(pattern, response, re.DOTALL)
-                if match:
-                    try:
-                        json_str = match.group(1) if '```' in pattern else match.group(0)
-                        result = json.loads(json_str)
-                        
-                        # Clean and filter the extracted data
-                        cleaned_result = {}
-                        for k, v in result.items():
-                            if not v or v == "null" or not str(v).strip():
-                                continue
-                            
-                            str_v = str(v).strip()
-                            
-                            # Skip placeholder values
-                            placeholder_phrases = [
-                                "valor extraído", "no encontrado", "no disponible",
-                                "n/a", "por definir", "pendiente", "null"
-                            ]
-                            if str_v.lower() in placeholder_phrases:
-                                continue
-                            
-                            # Clean numeric fields (remove currency symbols and formatting)
-                            if k in ["valor_total", "duracion"]:
-                                # Remove $, dots, commas, spaces
-                                clean_num = re.sub(r'[\$\.,\s]', '', str_v)
-                                # Try to extract just numbers
-                                num_match = re.search(r'\d+', clean_num)
-                                if num_match:
-                                    str_v = num_match.group(0)
-                            
-                            cleaned_result[k] = str_v
-                        
-                        return cleaned_result
-                    except json.JSONDecodeError:
-                        continue
-                        
-        except Exception as e:
-            print(f"AI extraction error: {e}")
-        
-        # Fall back to pattern extraction
-        return self._extract_with_patterns(text, doc_type)
+def _sample_by_tokens(text: str, max_tokens: int) -> str:
+    """Return `text`, or its beginning, middle and end if it exceeds `max_tokens`"""
+    encoding = _get_token_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        total = len(tokens)
+        decode = lambda start, stop: encoding.decode(tokens[start:stop])
+    else:
+        total = len(text) // CHARS_PER_TOKEN
+        decode = lambda start, stop: text[start * CHARS_PER_TOKEN:stop * CHARS_PER_TOKEN]
+    
+    if total <= max_tokens:
+        return text
+    
+    head_size, middle_size, tail_size = (int(max_tokens * share) for share in AI_CONTEXT_SPLIT)
+    middle_start = max(0, total // 2 - middle_size // 2)
+    beginning = decode(0, head_size)
+    middle = decode(middle_start, middle_start + middle_size)
+    end = decode(total - tail_size, total)
+    return f"{beginning}\n\n[...SECCIÓN INTERMEDIA...]\n\n{middle}\n\n[...SECCIÓN FINAL...]\n\n{end}"
+
+
+def _compile_keyword_pattern(keyword: str) -> Pattern:
+    """Compile the "keyword: value" capture pattern for a keyword"""
+    return re.compile(rf'{re.escape(keyword)}\s*[:\-]?\s*(.+?)(?:\n|$)', re.IGNORECASE)
+
+
+# Each distinct keyword is compiled once and the Pattern object is shared by
+# every doc_type/field that lists it (many keywords repeat across doc_types)
+KEYWORD_PATTERNS: Dict[str, Pattern] = {
+    keyword: _compile_keyword_pattern(keyword)
+    for keyword in dict.fromkeys(
+        keyword
+        for fields in DocumentDataExtractor.FIELD_MAPPINGS.values()
+        for keywords in fields.values()
+        for keyword in keywords
+    )
+}
+
+# FIELD_MAPPINGS with each keyword paired with its shared compiled pattern
+FIELD_PATTERNS: Dict[str, Dict[str, List[Tuple[str, Pattern]]]] = {
+    doc_type: {
+        field_name: [(keyword, KEYWORD_PATTERNS[keyword]) for keyword in keywords]
+        for field_name, keywords in fields.items()
+    }
+    for doc_type, fields in DocumentDataExtractor.FIELD_MAPPINGS.items()
+}
+
+# Single alternation over every keyword (longest first) used to find which
+# keywords occur in a text with one scan instead of one search per keyword
+KEYWORD_GATE_RE = re.compile(
+    "|".join(re.escape(keyword) for keyword in sorted(KEYWORD_PATTERNS, key=len, reverse=True)),
+    re.IGNORECASE
+)
+
+# Keywords present whenever a keyword matches, including the shorter ones it
+# contains ("nombre del proyecto" also contains "proyecto"), since the gate
+# scan does not report overlapping matches
+KEYWORD_IMPLIES: Dict[str, frozenset] = {
+    keyword.lower(): frozenset(other for other in KEYWORD_PATTERNS if other.lower() in keyword.lower())
+    for keyword in KEYWORD_PATTERNS
+}
+
+
+def _present_keywords(text: str) -> set:
+    """Return the extraction keywords that occur in `text` (case-insensitive)"""
+    present = set()
+    for match in KEYWORD_GATE_RE.finditer(text):
+        present.update(KEYWORD_IMPLIES.get(match.group(0).lower(), ()))
+        if len(present) == len(KEYWORD_PATTERNS):
+            break
+    return present
 
 
 def extract_data_from_upload(uploaded_file, doc_type: str, llm=None, user_context: str = "") -> Dict[str, Any]:
@@ -13,6 +13,7 @@ sys.path.append('..')
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from config import invoke_llm
 from prompts.analisis_sector_structured import (
     ANALISIS_SECTOR_SYSTEM_STRUCTURED,
     PROMPT_ANALISIS_SECTOR_ESTRUCTURADO
@@ -99,7 +100,7 @@ class AnalisisSectorGenerator:
         """
         chain = self._create_chain(PROMPT_ANALISIS_SECTOR_ESTRUCTURADO)
         
-        response = chain.invoke({
+        response = invoke_llm(chain, {
             "numero_contrato": data.get("numero_contrato", ""),
             "modalidad": data.get("modalidad", "Convenio Interadministrativo"),
             "municipio": data.get("municipio", ""),
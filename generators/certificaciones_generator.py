@@ -13,6 +13,7 @@ sys.path.append('..')
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from config import invoke_llm
 from prompts.certificaciones_structured import (
     CERTIFICACIONES_SYSTEM,
     PROMPT_CERTIFICACIONES
@@ -82,7 +83,7 @@ class CertificacionesGenerator:
         
         now = datetime.now()
         
-        response = chain.invoke({
+        response = invoke_llm(chain, {
             "municipio": data.get("municipio", ""),
             "departamento": data.get("departamento", ""),
             "entidad": data.get("entidad", ""),
@@ -12,6 +12,7 @@ sys.path.append('..')
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from config import invoke_llm
 from prompts.dts_structured import (
     DTS_SYSTEM_STRUCTURED,
     PROMPT_DTS_ESTRUCTURADO
@@ -79,7 +80,7 @@ class DTSGenerator:
         """
         chain = self._create_chain(PROMPT_DTS_ESTRUCTURADO)
         
-        response = chain.invoke({
+        response = invoke_llm(chain, {
             "municipio": data.get("municipio", ""),
             "departamento": data.get("departamento", ""),
             "entidad": data.get("entidad", ""),
@@ -11,6 +11,7 @@ sys.path.append('..')
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from config import invoke_llm
 from prompts.estudios_previos_structured import (
     ESTUDIOS_PREVIOS_SYSTEM_STRUCTURED,
     PROMPT_ESTUDIOS_PREVIOS_ESTRUCTURADO
@@ -115,7 +116,7 @@ class EstudiosPreviosGenerator:
         chain = self._create_chain(PROMPT_ESTUDIOS_PREVIOS_ESTRUCTURADO)
         
         # Generate structured content
-        response = chain.invoke({
+        response = invoke_llm(chain, {
             "municipio": data.get("municipio", ""),
             "departamento": data.get("departamento", ""),
             "entidad": data.get("entidad", ""),
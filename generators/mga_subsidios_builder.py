@@ -3,33 +3,458 @@ MGA Subsidios Document Builder
 Generates Word documents for complete MGA Subsidios (24 pages)
 """
 
+import atexit
 import os
+import platform
 import re
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from io import BytesIO
 from datetime import datetime
 from docx import Document
-from docx.shared import Inches, Pt, Cm, RGBColor
+from docx.shared import Inches, Pt, Cm, Emu, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from copy import deepcopy
+from itertools import zip_longest
+from xml.sax.saxutils import escape
+from docx.oxml.ns import qn, nsdecls
+from docx.oxml import OxmlElement, parse_xml
+
+try:
+    from docx2pdf import convert as docx2pdf_convert
+except ImportError:
+    docx2pdf_convert = None
+
+
+def _run_xml(size_half_pts: int, color: str = None, bold: bool = False) -> str:
+    """Serialize a <w:r> with its formatting, matching what python-docx writes"""
+    rpr = "<w:b/>" if bold else ""
+    if color:
+        rpr += f'<w:color w:val="{color}"/>'
+    rpr += f'<w:sz w:val="{size_half_pts}"/>'
+    return f"<w:r><w:rPr>{rpr}</w:rPr></w:r>"
+
+
+def _paragraph_template(runs: str, ppr: str = ""):
+    """Parse a <w:p> template once; callers deepcopy it and fill in run text"""
+    ppr = f"<w:pPr>{ppr}</w:pPr>" if ppr else ""
+    return parse_xml(f"<w:p {nsdecls('w')}>{ppr}{runs}</w:p>")
+
+
+# Text colors, interned once instead of constructing an RGBColor per run
+CLIENT_GREEN = RGBColor(112, 173, 71)
+CLIENT_BLUE = RGBColor(0, 112, 192)
+DARK_GREEN = RGBColor(0, 100, 0)
+GREEN = RGBColor(0, 128, 0)
+DARK_GREY = RGBColor(100, 100, 100)
+FOOTER_GREY = RGBColor(128, 128, 128)
+
+# Font sizes and paragraph spacings, likewise created once
+SIZE_7PT = Pt(7)
+SIZE_8PT = Pt(8)
+SIZE_9PT = Pt(9)
+SIZE_10PT = Pt(10)
+SIZE_11PT = Pt(11)
+SIZE_12PT = Pt(12)
+NO_SPACING = Pt(0)
+TIGHT_SPACING = Pt(2)
+
+# Pre-built OXML for the helpers called on every field of every page. Copying
+# these avoids the python-docx Paragraph/Run proxies and per-run style setters.
+HEADER_P = _paragraph_template(_run_xml(20, "008080", bold=True), '<w:jc w:val="right"/>')
+HEADER_WITH_SUBSECTION_P = _paragraph_template(
+    _run_xml(20, "008080") + _run_xml(20, "008080", bold=True), '<w:jc w:val="right"/>'
+)
+SECTION_TITLE_P = _paragraph_template(
+    _run_xml(28, "0099CC", bold=True), '<w:spacing w:after="240"/><w:jc w:val="center"/>'
+)
+SUBSECTION_TITLE_P = _paragraph_template(
+    _run_xml(22, "008080", bold=True), '<w:spacing w:before="240" w:after="120"/>'
+)
+PAGE_BREAK_P = _paragraph_template('<w:r><w:br w:type="page"/></w:r>')
+PAGE_BREAK_BR = parse_xml(f'<w:br {nsdecls("w")} w:type="page"/>')
+EMPTY_P = _paragraph_template("")
+BODY_TEXT_P = _paragraph_template("<w:r/>", '<w:spacing w:after="120"/>')
+FIELD_LABEL_P = _paragraph_template(_run_xml(20, "70AD47", bold=True), '<w:spacing w:after="40"/>')
+FIELD_SPACER_P = _paragraph_template("", '<w:spacing w:after="80"/>')
+FIELD_VALUE_TBL = parse_xml(
+    f"<w:tbl {nsdecls('w')}><w:tblPr><w:tblW w:type=\"auto\" w:w=\"0\"/>"
+    '<w:tblLayout w:type="autofit"/>'
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+    'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+    '<w:tblGrid><w:gridCol w:w="0"/></w:tblGrid><w:tr><w:tc><w:tcPr><w:tcW w:type="dxa" w:w="0"/>'
+    '<w:shd w:fill="F2F2F2"/><w:tcMar><w:top w:w="0" w:type="dxa"/><w:bottom w:w="0" w:type="dxa"/>'
+    '</w:tcMar></w:tcPr><w:p><w:pPr><w:spacing w:before="0" w:after="0" w:line="240" w:lineRule="auto"/>'
+    f"</w:pPr>{_run_xml(20)}</w:p></w:tc></w:tr></w:tbl>"
+)
+
+# (label, key, default) lines shown under each benefit on pages 18-19
+BENEFICIO_FIELDS = (
+    ("Tipo: ", "tipo", "Beneficios"),
+    ("Medido a través de: ", "medido", "Número"),
+    ("Bien producido: ", "bien_producido", ""),
+    ("Razón Precio Cuenta (RPC): ", "razon_precio_cuenta", ""),
+    ("Descripción Cantidad: ", "descripcion_cantidad", ""),
+    ("Descripción Valor Unitario: ", "descripcion_valor_unitario", ""),
+)
+
+# Nested AI-content paths read through _dig
+ESTUDIO_SERVICIO_PRINCIPAL = ("pagina_8_9_10_11_estudio_necesidades", "servicio_principal")
+DECISION_ALTERNATIVA = ("decision", "alternativa")
+
+
+def _dig(data, path, default=""):
+    """Follow a tuple of keys through nested dicts; default when a level is missing, None or not a dict"""
+    for key in path:
+        if not isinstance(data, dict):
+            return default
+        data = data.get(key)
+        if data is None:
+            return default
+    return data
+
+
+# Peso amounts in the MGA tables use "." for thousands and "," for decimals
+COP_FORMAT_SEPARATORS = str.maketrans(",.", ".,")
+COP_PARSE_CHARS = str.maketrans({".": None, "$": None, ",": "."})
+
+
+def _format_cop(value: float) -> str:
+    """Format a peso amount as the MGA shows it ($1.234.567,89)"""
+    return f"${value:,.2f}".translate(COP_FORMAT_SEPARATORS)
+
+
+def _parse_cop(text) -> float:
+    """Read a peso amount written as in the MGA ($1.234.567,89); 0.0 if it is not one"""
+    try:
+        return float(str(text).translate(COP_PARSE_CHARS).strip())
+    except ValueError:
+        return 0.0
+
+
+# Blank-line paragraph separator in AI-generated long text
+PARAGRAPH_SPLIT_RE = re.compile(r"\n{2,}")
+
+
+def _unescape_newlines(text: str) -> str:
+    """Turn literal "\\n" sequences left in AI output into real newlines"""
+    # str.replace beats a compiled re.sub for a fixed two-char needle
+    return text.replace("\\n", "\n")
+
+
+def _shading_template(color: str):
+    """Parse a <w:shd> cell fill once per color"""
+    return parse_xml(f'<w:shd {nsdecls("w")} w:fill="{color}"/>')
+
+
+# Cell fills used by the MGA tables, parsed once and deep-copied per cell
+SHADING_FILLS = {
+    color: _shading_template(color)
+    for color in ("0099CC", "F2F2F2", "E8F4F8", "7FC8D8", "7FC8A8", "8DB4E2", "E0E0E0", "FFFFFF")
+}
+VMERGE_RESTART = parse_xml(f'<w:vMerge {nsdecls("w")} w:val="restart"/>')
+VMERGE_CONTINUE = parse_xml(f'<w:vMerge {nsdecls("w")}/>')
+WHITE_RPR = parse_xml(f'<w:rPr {nsdecls("w")}><w:color w:val="FFFFFF"/></w:rPr>')
+TABLE_GRID_STYLE = parse_xml(f'<w:tblStyle {nsdecls("w")} w:val="TableGrid"/>')
+
+# Header-cell <w:rPr> elements keyed by (font size, bold), filled in by _header_rpr
+HEADER_RPRS = {}
+
+# <w:tcMar> elements keyed by (top, bottom), filled in by _cell_margins
+CELL_MARGINS = {}
+
+# String fragments for _build_table_fast, which serializes a whole table and parses it once
+TABLE_GRID_TBLPR_XML = (
+    '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:type="auto" w:w="0"/>{layout}'
+    '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" '
+    'w:noHBand="0" w:noVBand="1" w:val="04A0"/></w:tblPr>'
+)
+FIXED_LAYOUT_XML = '<w:tblLayout w:type="fixed"/>'
+WHITE_RPR_XML = '<w:rPr><w:color w:val="FFFFFF"/></w:rPr>'
+HEADER_BOLD_RPR_XML = '<w:rPr><w:b/><w:color w:val="FFFFFF"/></w:rPr>'
+RUN_BREAKS_RE = re.compile(r"([\t\r\n])")
+
+
+def _shading(color: str):
+    """Return the cached <w:shd> template for a fill color"""
+    shading = SHADING_FILLS.get(color)
+    if shading is None:
+        shading = SHADING_FILLS[color] = _shading_template(color)
+    return shading
+
+
+def _header_rpr(font_size: int = None, bold: bool = False):
+    """Return the cached white-text <w:rPr> for a header cell run (font_size in points)"""
+    key = (font_size, bold)
+    rpr = HEADER_RPRS.get(key)
+    if rpr is None:
+        xml = "<w:b/>" if bold else ""
+        xml += '<w:color w:val="FFFFFF"/>'
+        if font_size:
+            xml += f'<w:sz w:val="{font_size * 2}"/>'
+        rpr = HEADER_RPRS[key] = parse_xml(f'<w:rPr {nsdecls("w")}>{xml}</w:rPr>')
+    return rpr
+
+
+def _cell_margins(top: int, bottom: int):
+    """Return the cached <w:tcMar> template for top/bottom cell padding (twips)"""
+    key = (top, bottom)
+    margins = CELL_MARGINS.get(key)
+    if margins is None:
+        sides = "".join(
+            f'<w:{side} w:w="{value}" w:type="dxa"/>'
+            for side, value in (("top", top), ("bottom", bottom)) if value > 0
+        )
+        margins = CELL_MARGINS[key] = parse_xml(f'<w:tcMar {nsdecls("w")}>{sides}</w:tcMar>')
+    return margins
+
+
+def _cell_xml(width: str, fill: str = None, align: str = None, rpr: str = ""):
+    """Return the (prefix, suffix, empty) XML for one column's <w:tc>, surrounding the run content"""
+    shd = f'<w:shd w:fill="{fill}"/>' if fill else ""
+    ppr = f'<w:pPr><w:jc w:val="{align}"/></w:pPr>' if align else ""
+    start = f'<w:tc><w:tcPr><w:tcW w:type="dxa" w:w="{width}"/>{shd}</w:tcPr><w:p>{ppr}'
+    return f"{start}<w:r>{rpr}", "</w:r></w:p></w:tc>", f"{start}</w:p></w:tc>"
+
+
+def _set_tc_text(tc, text: str):
+    """
+    Set a <w:tc>'s text with the same result as python-docx's _Cell.text. A fresh
+    cell's empty paragraph gets the run directly instead of being removed and re-added.
+    """
+    p = tc.find(qn('w:p'))
+    if p is None or len(p) or p.getnext() is not None:
+        tc.clear_content()
+        p = tc.add_p()
+    p.add_r().text = text
+
+
+def _run_content_xml(text: str) -> str:
+    """Serialize run content as python-docx's text setter would (tab -> <w:tab/>, newline -> <w:br/>)"""
+    parts = []
+    for piece in RUN_BREAKS_RE.split(text):
+        if not piece:
+            continue
+        if piece == "\t":
+            parts.append("<w:tab/>")
+        elif piece in "\r\n":
+            parts.append("<w:br/>")
+        elif piece != piece.strip():
+            parts.append(f'<w:t xml:space="preserve">{escape(piece)}</w:t>')
+        else:
+            parts.append(f"<w:t>{escape(piece)}</w:t>")
+    return "".join(parts)
+
+
+def _grid_table_template(header_rows, value_cols: int):
+    """
+    Parse a fixed-layout 'Table Grid' table once: pre-styled header rows of
+    (text, fill, rPr) cells (None for a blank cell) followed by one row of
+    empty value runs. Column widths are zero here and sized when cloned.
+    """
+    xml = [
+        f"<w:tbl {nsdecls('w')}>",
+        TABLE_GRID_TBLPR_XML.format(layout=""),
+        "<w:tblGrid>",
+        '<w:gridCol w:w="0"/>' * value_cols,
+        "</w:tblGrid>",
+    ]
+    for cells in header_rows:
+        xml.append("<w:tr>")
+        for cell in cells:
+            if cell is None:
+                xml.append(_cell_xml("0")[2])
+            else:
+                text, fill, rpr = cell
+                prefix, suffix, _ = _cell_xml("0", fill, rpr=rpr)
+                xml += (prefix, _run_content_xml(text), suffix)
+        xml.append("</w:tr>")
+    prefix, suffix, _ = _cell_xml("0")
+    xml += ("<w:tr>", (prefix + suffix) * value_cols, "</w:tr></w:tbl>")
+    return parse_xml("".join(xml))
+
+
+# Page 21 economic evaluation table: two fixed header rows over a row of indicator values
+EVALUACION_ECONOMICA_TBL = _grid_table_template(
+    [
+        [
+            ("Indicadores de rentabilidad", "0099CC", ""), None, None,
+            ("Indicadores de costo-eficiencia", "0099CC", ""),
+            ("Indicadores de costo mínimo", "0099CC", ""), None,
+        ],
+        [
+            (header, "7FC8D8", '<w:rPr><w:sz w:val="16"/></w:rPr>')
+            for header in (
+                "Valor Presente Neto (VPN)", "Tasa Interna de Retorno (TIR)",
+                "Relación Costo Beneficio (RCB)", "Costo por beneficiario",
+                "Valor presente de los costos", "Costo Anual Equivalente (CAE)",
+            )
+        ],
+    ],
+    value_cols=6,
+)
+
+
+# Parsed letterhead templates keyed by content digest; builds get a deep copy
+TEMPLATE_CACHE_SIZE = 4
+_template_cache: "OrderedDict[bytes, Document]" = OrderedDict()
+_template_cache_lock = threading.Lock()
+
+
+# Characters dropped from the municipio when naming the output file
+FILENAME_UNSAFE_RE = re.compile(r'[^a-zA-Z0-9_\-]')
+
+# Values accepted for MGASubsidiosBuilder(output_format=...)
+OUTPUT_FORMATS = ("pdf", "docx", "both")
+
+# Platforms where DOCX -> PDF conversion is available (Microsoft Word via docx2pdf/COM)
+PDF_PLATFORMS = ("Windows", "Darwin")
+HOST_SYSTEM = platform.system()
+
+# PDF conversion on Windows goes through one Word instance owned by a single
+# worker thread. COM objects are bound to the thread that created them, so
+# every conversion job is queued to that thread instead of being run by the
+# (short-lived) generation threads.
+WD_FORMAT_PDF = 17
+WORD_SHUTDOWN_TIMEOUT_SECONDS = 30
+# A conversion still running after this is treated as a hung Word (e.g. a modal
+# dialog): the caller falls back to the DOCX and the worker is replaced
+WORD_CONVERT_TIMEOUT_SECONDS = 120
+# (thread, job queue) of the current Word worker
+_word_worker = None
+_word_worker_lock = threading.Lock()
+
+
+def _quit_word(app):
+    """Quit a Word instance, ignoring errors from one that already died"""
+    if app is not None:
+        try:
+            app.Quit()
+        except Exception:
+            pass
+
+
+def _fail_word_jobs(jobs: queue.Queue, error: BaseException):
+    """Resolve the jobs still queued for a worker that will not serve them"""
+    while True:
+        try:
+            job = jobs.get_nowait()
+        except queue.Empty:
+            return
+        if job is not None and job[2].set_running_or_notify_cancel():
+            job[2].set_exception(error)
+
+
+def _serve_word_jobs(jobs: queue.Queue):
+    """Convert queued (docx, pdf, future) jobs with one Word instance until a None job arrives"""
+    import pythoncom
+    import win32com.client
+    pythoncom.CoInitialize()
+    app = None
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            docx_path, pdf_path, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if app is None:
+                    app = win32com.client.DispatchEx("Word.Application")
+                    app.Visible = False
+                    app.DisplayAlerts = False
+                document = app.Documents.Open(docx_path)
+                try:
+                    document.SaveAs(pdf_path, FileFormat=WD_FORMAT_PDF)
+                finally:
+                    document.Close(0)
+            except Exception as e:
+                # Start a fresh instance for the next job
+                _quit_word(app)
+                app = None
+                future.set_exception(e)
+            else:
+                future.set_result(pdf_path)
+    finally:
+        _quit_word(app)
+        pythoncom.CoUninitialize()
+
+
+def _word_worker_loop(jobs: queue.Queue):
+    """Word worker thread; if it stops abnormally the queued jobs fail instead of hanging"""
+    try:
+        _serve_word_jobs(jobs)
+    except BaseException as e:
+        _fail_word_jobs(jobs, e)
+        raise
+
+
+def _abandon_word_worker(worker):
+    """Route later conversions to a new worker and release the jobs queued behind a hung one"""
+    global _word_worker
+    with _word_worker_lock:
+        if _word_worker is worker:
+            _word_worker = None
+    thread, jobs = worker
+    _fail_word_jobs(jobs, FutureTimeoutError("Word did not finish the previous conversion"))
+    jobs.put(None)  # the worker exits if Word ever returns
+
+
+@atexit.register
+def _stop_word_worker():
+    """Let the worker quit Word and release COM on its own thread"""
+    worker = _word_worker
+    if worker is not None and worker[0].is_alive():
+        worker[1].put(None)
+        worker[0].join(WORD_SHUTDOWN_TIMEOUT_SECONDS)
+
+
+def _convert_with_word(docx_path: str, pdf_path: str):
+    """Convert DOCX to PDF on the Word worker thread (what docx2pdf does, minus the per-call Word startup)"""
+    global _word_worker
+    import win32com.client  # noqa: F401 - fail here (ImportError) rather than in the worker
+    future = Future()
+    with _word_worker_lock:
+        worker = _word_worker
+        running = worker is not None and worker[0].is_alive()
+        if not running:
+            jobs = queue.Queue()
+            thread = threading.Thread(target=_word_worker_loop, args=(jobs,), name="word-pdf", daemon=True)
+            worker = _word_worker = (thread, jobs)
+        # Queued before a new worker starts, so one that fails on start-up still fails this job
+        worker[1].put((os.path.abspath(docx_path), os.path.abspath(pdf_path), future))
+        if not running:
+            worker[0].start()
+    try:
+        future.result(timeout=WORD_CONVERT_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        future.cancel()
+        _abandon_word_worker(worker)
+        raise
 
 
 class MGASubsidiosBuilder:
     """Builder for MGA Subsidios Word documents (24 pages)"""
     
-    def __init__(self, output_dir: str = "output"):
+    # Styled blank document shared by builds without a letterhead; each build gets a deep copy
+    _BLANK_DOCUMENT = None
+    
+    def __init__(self, output_dir: str = "output", output_format: str = "pdf"):
+        """
+        output_format: "pdf" converts and removes the DOCX, "docx" skips PDF
+        conversion, "both" converts and keeps the DOCX next to the PDF.
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
         self.doc = None
-    
-    def _safe_list(self, value, default=None):
-        """Safely convert a value to a list, returning default if not iterable"""
-        if default is None:
-            default = []
-        if isinstance(value, list):
-            return value
-        return default
+        self.output_format = output_format
     
     def _safe_str(self, value, default: str = "") -> str:
         """Safely convert value to string (handles dict, list, None)"""
@@ -51,10 +476,11 @@ class MGASubsidiosBuilder:
         
         if letterhead_file:
             self.doc = self._load_template(letterhead_file)
+            self._apply_styles()
         else:
-            self.doc = Document()
-        
-        self._apply_styles()
+            self.doc = self._blank_document()
+        self._block_width = self.doc._block_width
+        self._page_break_after = None
         
         # Page 1 - Datos Básicos (ROBUST DATA MAPPING)
         page1_content = ai_content.get("pagina_1_datos_basicos", {})
@@ -75,66 +501,62 @@ class MGASubsidiosBuilder:
              
         self._add_page_1_datos_basicos(page1_content)
         
-        self.doc.add_page_break()
-        
-        # Page 2 - Plan de Desarrollo
-        self._add_page_2_plan_desarrollo(ai_content.get("pagina_2_plan_desarrollo", {}))
-        
-        self.doc.add_page_break()
-        
-        # Page 3 - Problemática
-        self._add_page_3_problematica(ai_content.get("pagina_3_problematica", {}))
-        
-        self.doc.add_page_break()
-        
-        # Page 4 - Causas y Efectos
-        self._add_page_4_causas_efectos(ai_content.get("pagina_4_causas_efectos", {}))
-        
-        self.doc.add_page_break()
-        
-        # Page 5 - Participantes
-        self._add_page_5_participantes(ai_content.get("pagina_5_participantes", {}))
-        
-        self.doc.add_page_break()
-        
-        # Pages 6-11
-        self._add_pages_6_11(ai_content)
-        
-        self.doc.add_page_break()
-        
-        # Pages 12-16
-        self._add_pages_12_16(ai_content)
-        
-        self.doc.add_page_break()
-        
-        # Pages 17-21
-        self._add_pages_17_21(ai_content)
-        
-        self.doc.add_page_break()
-        
-        # Pages 22+ (Dynamic Indicators)
-        self._add_pages_indicadores(ai_content)
-        
-        self.doc.add_page_break()
-        
-        # Pages 23+ (Dynamic Regionalization)
-        self._add_pages_regionalizacion(ai_content)
-        
-        self.doc.add_page_break()
-        
-        # Page 24 - Focalización
-        self._add_page_focalizacion(ai_content)
+        # Remaining pages in document order, each starting on a new page. Pages share
+        # self.doc (styles, numbering, block width), so they are built sequentially.
+        pages = [
+            (self._add_page_2_plan_desarrollo, ai_content.get("pagina_2_plan_desarrollo", {})),  # Page 2 - Plan de Desarrollo
+            (self._add_page_3_problematica, ai_content.get("pagina_3_problematica", {})),  # Page 3 - Problemática
+            (self._add_page_4_causas_efectos, ai_content.get("pagina_4_causas_efectos", {})),  # Page 4 - Causas y Efectos
+            (self._add_page_5_participantes, ai_content.get("pagina_5_participantes", {})),  # Page 5 - Participantes
+            (self._add_pages_6_11, ai_content),  # Pages 6-11
+            (self._add_pages_12_16, ai_content),  # Pages 12-16
+            (self._add_pages_17_21, ai_content),  # Pages 17-21
+            (self._add_pages_indicadores, ai_content),  # Pages 22+ (Dynamic Indicators)
+            (self._add_pages_regionalizacion, ai_content),  # Pages 23+ (Dynamic Regionalization)
+            (self._add_page_focalizacion, ai_content),  # Page 24 - Focalización
+        ]
+        for add_page, page_content in pages:
+            self._add_page_break()
+            add_page(page_content)
+        self._flush_page_break()
         
         # Save and return
         return self._save_document(data)
     
+    def _blank_document(self):
+        """Return a copy of the styled blank document (page setup + footer), built on first use"""
+        blank = MGASubsidiosBuilder._BLANK_DOCUMENT
+        if blank is None:
+            self.doc = Document()
+            self._apply_styles()
+            blank = MGASubsidiosBuilder._BLANK_DOCUMENT = self.doc
+        return deepcopy(blank)
+    
     def _load_template(self, letterhead_file):
-        """Load template from uploaded file"""
+        """Load template from uploaded file (parsed once per distinct content)"""
         try:
             if hasattr(letterhead_file, 'read'):
-                return Document(BytesIO(letterhead_file.read()))
+                if hasattr(letterhead_file, 'seek'):
+                    letterhead_file.seek(0)
+                blob = letterhead_file.read()
             else:
-                return Document(letterhead_file)
+                with open(letterhead_file, 'rb') as f:
+                    blob = f.read()
+            
+            key = hashlib.blake2b(blob, digest_size=16).digest()
+            with _template_cache_lock:
+                template = _template_cache.get(key)
+                if template is not None:
+                    _template_cache.move_to_end(key)
+            
+            if template is None:
+                template = Document(BytesIO(blob))
+                with _template_cache_lock:
+                    _template_cache[key] = template
+                    while len(_template_cache) > TEMPLATE_CACHE_SIZE:
+                        _template_cache.popitem(last=False)
+            
+            return deepcopy(template)
         except Exception:
             return Document()
     
@@ -167,8 +589,8 @@ class MGASubsidiosBuilder:
             
             # Add "Página " text
             run_text = p.add_run("Página ")
-            run_text.font.size = Pt(9)
-            run_text.font.color.rgb = RGBColor(128, 128, 128)
+            run_text.font.size = SIZE_9PT
+            run_text.font.color.rgb = FOOTER_GREY
             
             # Add page number field with proper structure
             run = p.add_run()
@@ -188,8 +610,8 @@ class MGASubsidiosBuilder:
             run3._r.append(fld_char_separate)
             
             run4 = p.add_run("1")  # Placeholder that will be replaced
-            run4.font.size = Pt(9)
-            run4.font.color.rgb = RGBColor(128, 128, 128)
+            run4.font.size = SIZE_9PT
+            run4.font.color.rgb = FOOTER_GREY
             
             run5 = p.add_run()
             fld_char_end = OxmlElement('w:fldChar')
@@ -214,8 +636,8 @@ class MGASubsidiosBuilder:
         cell_logo = header_table.rows[0].cells[0]
         p_logo = cell_logo.paragraphs[0]
         run_logo = p_logo.add_run("Departamento\nNacional de Planeación")
-        run_logo.font.size = Pt(8)
-        run_logo.font.color.rgb = RGBColor(0, 100, 0)  # Dark green
+        run_logo.font.size = SIZE_8PT
+        run_logo.font.color.rgb = DARK_GREEN
         run_logo.bold = True
         
         # Center cell - Project title (Blue text, no background)
@@ -224,8 +646,8 @@ class MGASubsidiosBuilder:
         p_title.alignment = WD_ALIGN_PARAGRAPH.CENTER
         if nombre_proyecto:
             run_title = p_title.add_run(nombre_proyecto)
-            run_title.font.size = Pt(8)
-            run_title.font.color.rgb = RGBColor(0, 112, 192)  # Client Blue
+            run_title.font.size = SIZE_8PT
+            run_title.font.color.rgb = CLIENT_BLUE
             # run_title.bold = True
         
         # Right cell - Date
@@ -236,87 +658,198 @@ class MGASubsidiosBuilder:
         # Format: Impreso el DD/MM/YYYY HH:MM:SS p.m.
         date_str = f"Impreso el {now.strftime('%d/%m/%Y %I:%M:%S %p').lower()}"
         run_date = p_date.add_run(date_str)
-        run_date.font.size = Pt(7)
-        run_date.font.color.rgb = RGBColor(100, 100, 100)
+        run_date.font.size = SIZE_7PT
+        run_date.font.color.rgb = DARK_GREY
         
         # Add spacing after header
-        self.doc.add_paragraph()
+        self._add_spacer()
+    
+    def _append_element(self, element):
+        """Append a block element to the body, ahead of the trailing section properties"""
+        body = self.doc.element.body
+        if body.sectPr is not None:
+            body.sectPr.addprevious(element)
+        else:
+            body.append(element)
+        return element
+    
+    def _append_elements(self, elements):
+        """Append several block elements to the body in a single tree mutation"""
+        body = self.doc.element.body
+        end = body.index(body.sectPr) if body.sectPr is not None else len(body)
+        body[end:end] = elements
+    
+    def _add_spacer(self):
+        """Add an empty paragraph used as vertical spacing"""
+        self._append_block(EMPTY_P)
+    
+    def _add_text_paragraphs(self, text: str):
+        """Add one body paragraph per blank-line separated block of AI text"""
+        paragraphs = []
+        for para in PARAGRAPH_SPLIT_RE.split(_unescape_newlines(text)):
+            p = deepcopy(BODY_TEXT_P)
+            p[-1].text = para
+            paragraphs.append(p)
+        self._append_elements(paragraphs)
+    
+    def _append_block(self, template, *texts):
+        """Copy a pre-built paragraph/table into the body and fill its runs in order"""
+        element = deepcopy(template)
+        for r, text in zip(element.iter(qn('w:r')), texts):
+            r.text = text
+        return self._append_element(element)
+    
+    def _add_grid_table(self, rows: int, cols: int):
+        """Add a table in 'Table Grid' style, setting the style id without a styles-part lookup"""
+        table = self.doc.add_table(rows=rows, cols=cols)
+        table._tbl.tblPr.insert(0, deepcopy(TABLE_GRID_STYLE))
+        return table
+    
+    def _build_table_fast(self, headers, rows, shade_hex: str = "0099CC", col_widths=None,
+                          header_bold: bool = False, header_align: str = None, align: str = None,
+                          band_fill: str = None):
+        """
+        Append a 'Table Grid' table in one pass: a shaded header row with white
+        text followed by the data rows. The table is serialized as one XML string
+        and parsed once. A None cell value leaves the cell empty.
+        col_widths (twips) fixes the column layout; band_fill shades the 1st, 3rd, ... data rows.
+        """
+        if col_widths:
+            widths = [str(w) for w in col_widths]
+        else:
+            widths = [str(Emu(self._block_width // len(headers)).twips)] * len(headers)
+        
+        header_rpr = HEADER_BOLD_RPR_XML if header_bold else WHITE_RPR_XML
+        header_cells = [_cell_xml(w, shade_hex, header_align, header_rpr) for w in widths]
+        data_cells = [_cell_xml(w, None, align) for w in widths]
+        band_cells = [_cell_xml(w, band_fill, align) for w in widths] if band_fill else data_cells
+        
+        xml = [
+            f"<w:tbl {nsdecls('w')}>",
+            TABLE_GRID_TBLPR_XML.format(layout=FIXED_LAYOUT_XML if col_widths else ""),
+            "<w:tblGrid>",
+            *(f'<w:gridCol w:w="{w}"/>' for w in widths),
+            "</w:tblGrid>",
+        ]
+        for row_index, values in enumerate([headers, *rows]):
+            if row_index == 0:
+                cells = header_cells
+            else:
+                cells = band_cells if row_index % 2 else data_cells
+            xml.append("<w:tr>")
+            for (prefix, suffix, empty), value in zip(cells, values):
+                if value is None:
+                    xml.append(empty)
+                else:
+                    xml += (prefix, _run_content_xml(value), suffix)
+            xml.append("</w:tr>")
+        xml.append("</w:tbl>")
+        
+        return self._append_element(parse_xml("".join(xml)))
+    
+    def _append_grid_template(self, template, values):
+        """Clone a _grid_table_template table sized to the text block and fill its value row"""
+        table = deepcopy(template)
+        width = str(Emu(self._block_width // len(values)).twips)
+        for el in table.iter(qn('w:gridCol'), qn('w:tcW')):
+            el.set(qn('w:w'), width)
+        for r, value in zip(table[-1].iter(qn('w:r')), values):
+            r.text = value
+        return self._append_element(table)
+    
+    def _append_rows_bulk(self, table, rows):
+        """
+        Append plain-text data rows to a python-docx table in a single parse,
+        as add_row() would lay them out (cell widths from the table grid).
+        A None value leaves the cell empty.
+        """
+        tbl = table._tbl
+        cells = [_cell_xml(col.get(qn('w:w'))) for col in tbl.tblGrid.iterchildren(qn('w:gridCol'))]
+        xml = [f"<w:tbl {nsdecls('w')}>"]
+        for values in rows:
+            xml.append("<w:tr>")
+            for (prefix, suffix, empty), value in zip(cells, values):
+                if value is None:
+                    xml.append(empty)
+                else:
+                    xml += (prefix, _run_content_xml(value), suffix)
+            xml.append("</w:tr>")
+        xml.append("</w:tbl>")
+        new_rows = list(parse_xml("".join(xml)))
+        tbl.extend(new_rows)
+        return new_rows
+    
+    def _last_block(self):
+        """Return the last block element in the body (before the section properties)"""
+        body = self.doc.element.body
+        if body.sectPr is not None:
+            return body.sectPr.getprevious()
+        return body[-1] if len(body) else None
+    
+    def _add_page_break(self):
+        """
+        Start a new page. The break is folded into the next header paragraph when
+        that header directly follows; otherwise it gets its own paragraph.
+        """
+        self._flush_page_break()
+        self._page_break_after = self._last_block()
+        if self._page_break_after is None:
+            self._append_block(PAGE_BREAK_P)
+    
+    def _flush_page_break(self):
+        """Write a pending page break as a standalone paragraph where it was requested"""
+        anchor = self._page_break_after
+        if anchor is not None:
+            self._page_break_after = None
+            anchor.addnext(deepcopy(PAGE_BREAK_P))
     
     def _add_header(self, section_name: str, subsection: str = ""):
         """Add standard MGA section header (right-aligned section indicator)"""
-        p = self.doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        starts_page = self._page_break_after is not None and self._page_break_after is self._last_block()
+        if not starts_page:
+            self._flush_page_break()
         
         if subsection:
-            run = p.add_run(f"{section_name} / ")
-            run.font.size = Pt(10)
-            run.font.color.rgb = RGBColor(0, 128, 128)  # Teal
-            run2 = p.add_run(subsection)
-            run2.font.size = Pt(10)
-            run2.font.color.rgb = RGBColor(0, 128, 128)
-            run2.bold = True
+            p = self._append_block(HEADER_WITH_SUBSECTION_P, f"{section_name} / ", subsection)
         else:
-            run = p.add_run(section_name)
-            run.font.size = Pt(10)
-            run.font.color.rgb = RGBColor(0, 128, 128)
-            run.bold = True
+            p = self._append_block(HEADER_P, section_name)
+        
+        if starts_page:
+            self._page_break_after = None
+            p.find(qn('w:r')).rPr.addnext(deepcopy(PAGE_BREAK_BR))
     
     def _add_section_title(self, title: str, color_hex: str = "0099CC"):
         """Add section title in blue"""
-        p = self.doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run = p.add_run(title)
-        run.font.size = Pt(14)
-        run.font.color.rgb = RGBColor(0, 153, 204)  # Blue
-        run.bold = True
-        p.paragraph_format.space_after = Pt(12)
+        self._append_block(SECTION_TITLE_P, title)
     
     def _add_subsection_title(self, title: str):
         """Add subsection title"""
-        p = self.doc.add_paragraph()
-        run = p.add_run(title)
-        run.font.size = Pt(11)
-        run.font.color.rgb = RGBColor(0, 128, 128)  # Teal
-        run.bold = True
-        p.paragraph_format.space_before = Pt(12)
-        p.paragraph_format.space_after = Pt(6)
+        self._append_block(SUBSECTION_TITLE_P, title)
     
     
     def _add_field(self, label: str, value: str):
         """Add a label-value field (label on top, value in gray box)"""
-        # Label
-        p = self.doc.add_paragraph()
-        run_label = p.add_run(label)
-        run_label.font.size = Pt(10)
-        run_label.font.color.rgb = RGBColor(112, 173, 71)  # Client Green (roughly)
-        run_label.bold = True
-        p.paragraph_format.space_after = Pt(2)
+        self._append_block(FIELD_LABEL_P, label)
         
-        # Value in gray box (Table 1x1)
-        table = self.doc.add_table(rows=1, cols=1)
-        table.autofit = True
-        cell = table.rows[0].cells[0]
-        self._set_cell_shading(cell, "F2F2F2")  # Light Gray
-        
-        p_val = cell.paragraphs[0]
-        p_val.paragraph_format.space_before = Pt(0)
-        p_val.paragraph_format.space_after = Pt(0)
-        p_val.paragraph_format.line_spacing = 1.0
-        # Reduce cell margins
-        tcPr = cell._tc.get_or_add_tcPr()
-        tcMar = OxmlElement('w:tcMar')
-        for side in ['top', 'bottom']:
-            node = OxmlElement(f'w:{side}')
-            node.set(qn('w:w'), '0') # Slimmer box (0 margins)
-            node.set(qn('w:type'), 'dxa')
-            tcMar.append(node)
-        tcPr.append(tcMar)
-        
-        run_val = p_val.add_run(value)
-        run_val.font.size = Pt(10)
+        # Value in gray box (1x1 table, zero top/bottom margins) sized to the text block
+        table = self._append_block(FIELD_VALUE_TBL, value)
+        width = str(self._block_width.twips)
+        table.find(qn('w:tblGrid'))[0].set(qn('w:w'), width)
+        table.find('.//' + qn('w:tcW')).set(qn('w:w'), width)
         
         # Add spacing after field
-        self.doc.add_paragraph().paragraph_format.space_after = Pt(4)
+        self._append_block(FIELD_SPACER_P)
+    
+    def _add_fields_block(self, pairs):
+        """Add "label value" lines (bold label) as one paragraph, one line per pair"""
+        if not pairs:
+            return None
+        lines = [
+            f'<w:r><w:rPr><w:b/></w:rPr>{_run_content_xml(label)}</w:r><w:r>{_run_content_xml(value)}'
+            for label, value in pairs
+        ]
+        xml = "<w:br/></w:r>".join(lines)
+        return self._append_element(parse_xml(f"<w:p {nsdecls('w')}>{xml}</w:r></w:p>"))
     
     def _add_inline_field(self, label: str, value: str):
         """Add a label-value field inline (Label | Value in gray box)"""
@@ -327,16 +860,16 @@ class MGASubsidiosBuilder:
         cell_label = table.rows[0].cells[0]
         p_label = cell_label.paragraphs[0]
         run_label = p_label.add_run(label)
-        run_label.font.size = Pt(10)
-        run_label.font.color.rgb = RGBColor(112, 173, 71)  # Client Green
+        run_label.font.size = SIZE_10PT
+        run_label.font.color.rgb = CLIENT_GREEN
         run_label.bold = True
         
         # Cell 2: Value in Gray Box
         cell_val = table.rows[0].cells[1]
         self._set_cell_shading(cell_val, "F2F2F2")  # Light Gray
         p_val = cell_val.paragraphs[0]
-        p_val.paragraph_format.space_before = Pt(0)
-        p_val.paragraph_format.space_after = Pt(0)
+        p_val.paragraph_format.space_before = NO_SPACING
+        p_val.paragraph_format.space_after = NO_SPACING
         p_val.paragraph_format.line_spacing = 1.0
         
         # Reduce margins
@@ -350,13 +883,13 @@ class MGASubsidiosBuilder:
         tcPr.append(tcMar)
 
         run_val = p_val.add_run(value)
-        run_val.font.size = Pt(10)
+        run_val.font.size = SIZE_10PT
         
         # Adjust column widths if possible, or just let autofit handle it
         # Docx tables are tricky with exact widths, autofit usually works for this layout
         
         # Add spacing
-        self.doc.add_paragraph().paragraph_format.space_after = Pt(4)
+        self._append_block(FIELD_SPACER_P)
     
     def _add_page_1_datos_basicos(self, content: dict):
         """Add Page 1 - Datos Básicos with proper table structure matching client template"""
@@ -375,7 +908,7 @@ class MGASubsidiosBuilder:
         self._add_field("Nombre", content.get("nombre", ""))
         
         # Add some spacing
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # TWO-COLUMN TABLE: Tipología | Código BPIN
         table_tipo_bpin = self.doc.add_table(rows=2, cols=2)
@@ -386,13 +919,13 @@ class MGASubsidiosBuilder:
         cell_bpin_label = table_tipo_bpin.rows[0].cells[1]
         
         run_tipo = cell_tipo_label.paragraphs[0].add_run("Tipología")
-        run_tipo.font.size = Pt(10)
-        run_tipo.font.color.rgb = RGBColor(112, 173, 71)  # Client Green
+        run_tipo.font.size = SIZE_10PT
+        run_tipo.font.color.rgb = CLIENT_GREEN
         run_tipo.bold = True
         
         run_bpin = cell_bpin_label.paragraphs[0].add_run("Código BPIN")
-        run_bpin.font.size = Pt(10)
-        run_bpin.font.color.rgb = RGBColor(112, 173, 71)  # Client Green
+        run_bpin.font.size = SIZE_10PT
+        run_bpin.font.color.rgb = CLIENT_GREEN
         run_bpin.bold = True
         
         # Row 1: Values (Gray Box)
@@ -404,8 +937,8 @@ class MGASubsidiosBuilder:
         
         # Make slimmer
         for cell in [cell_tipo_val, cell_bpin_val]:
-            cell.paragraphs[0].paragraph_format.space_before = Pt(0)
-            cell.paragraphs[0].paragraph_format.space_after = Pt(0)
+            cell.paragraphs[0].paragraph_format.space_before = NO_SPACING
+            cell.paragraphs[0].paragraph_format.space_after = NO_SPACING
             cell.paragraphs[0].paragraph_format.line_spacing = 1.0
             tcPr = cell._tc.get_or_add_tcPr()
             tcMar = OxmlElement('w:tcMar')
@@ -417,19 +950,19 @@ class MGASubsidiosBuilder:
             tcPr.append(tcMar)
         
         tipo_text = cell_tipo_val.paragraphs[0].add_run(content.get("tipologia", "A - PIIP - Bienes y Servicios"))
-        tipo_text.font.size = Pt(10)
+        tipo_text.font.size = SIZE_10PT
         
         bpin_text = cell_bpin_val.paragraphs[0].add_run(content.get("codigo_bpin", ""))
-        bpin_text.font.size = Pt(10)
+        bpin_text.font.size = SIZE_10PT
         
         # Add some spacing
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Sector field
         self._add_field("Sector", content.get("sector", ""))
         
         # Add some spacing
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # TWO-COLUMN: Es Proyecto Tipo | Fecha creación works differently in client screenshot
         # Client screenshot: "Es Proyecto Tipo: [No]" (Gray box) ... "Fecha creación: [Date]" (Gray box)
@@ -440,35 +973,35 @@ class MGASubsidiosBuilder:
         
         # Cell 0: Label "Es Proyecto Tipo"
         run_es = table_tipo_fecha.rows[0].cells[0].paragraphs[0].add_run("Es Proyecto Tipo:")
-        run_es.font.size = Pt(10)
-        run_es.font.color.rgb = RGBColor(112, 173, 71)
+        run_es.font.size = SIZE_10PT
+        run_es.font.color.rgb = CLIENT_GREEN
         run_es.bold = True
         
         # Cell 1: Value "No" (Gray Box)
         cell_es_val = table_tipo_fecha.rows[0].cells[1]
         self._set_cell_shading(cell_es_val, "F2F2F2")
-        cell_es_val.paragraphs[0].paragraph_format.space_before = Pt(0)
-        cell_es_val.paragraphs[0].paragraph_format.space_after = Pt(0)
+        cell_es_val.paragraphs[0].paragraph_format.space_before = NO_SPACING
+        cell_es_val.paragraphs[0].paragraph_format.space_after = NO_SPACING
         run_es_val = cell_es_val.paragraphs[0].add_run(content.get("es_proyecto_tipo", "No"))
-        run_es_val.font.size = Pt(10)
+        run_es_val.font.size = SIZE_10PT
         
         # Cell 2: Label "Fecha creación"
         run_fe = table_tipo_fecha.rows[0].cells[2].paragraphs[0].add_run("Fecha creación:")
-        run_fe.font.size = Pt(10)
-        run_fe.font.color.rgb = RGBColor(112, 173, 71)
+        run_fe.font.size = SIZE_10PT
+        run_fe.font.color.rgb = CLIENT_GREEN
         run_fe.bold = True
         table_tipo_fecha.rows[0].cells[2].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
         
         # Cell 3: Value Date (Gray Box)
         cell_fe_val = table_tipo_fecha.rows[0].cells[3]
         self._set_cell_shading(cell_fe_val, "F2F2F2")
-        cell_fe_val.paragraphs[0].paragraph_format.space_before = Pt(0)
-        cell_fe_val.paragraphs[0].paragraph_format.space_after = Pt(0)
+        cell_fe_val.paragraphs[0].paragraph_format.space_before = NO_SPACING
+        cell_fe_val.paragraphs[0].paragraph_format.space_after = NO_SPACING
         run_fe_val = cell_fe_val.paragraphs[0].add_run(content.get("fecha_creacion", datetime.now().strftime("%d/%m/%Y %H:%M:%S")))
-        run_fe_val.font.size = Pt(10)
+        run_fe_val.font.size = SIZE_10PT
         
         # Add some spacing
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Identificador - inline layout
         self._add_inline_field("Identificador:", content.get("identificador", ""))
@@ -482,8 +1015,8 @@ class MGASubsidiosBuilder:
     def _add_horizontal_line(self):
         """Add a thin horizontal separator line"""
         p = self.doc.add_paragraph()
-        p.paragraph_format.space_before = Pt(2)
-        p.paragraph_format.space_after = Pt(2)
+        p.paragraph_format.space_before = TIGHT_SPACING
+        p.paragraph_format.space_after = TIGHT_SPACING
         # Create a simple border line using a paragraph border
         pPr = p._p.get_or_add_pPr()
         pBdr = OxmlElement('w:pBdr')
@@ -509,24 +1042,17 @@ class MGASubsidiosBuilder:
         self._add_field("Programa", plan_nacional.get("programa", ""))
         
         # Table
-        table = self.doc.add_table(rows=2, cols=4)
-        table.style = 'Table Grid'
+        table = self._add_grid_table(rows=2, cols=4)
         
-        headers = ["Transformación", "Pilar", "Catalizador", "Componente"]
-        for i, h in enumerate(headers):
-            cell = table.rows[0].cells[i]
-            cell.text = h
-            self._set_cell_shading(cell, "0099CC")
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-                run.font.size = Pt(8)
+        self._style_header_row(
+            table.rows[0], ["Transformación", "Pilar", "Catalizador", "Componente"], font_size=8
+        )
         
-        table.rows[1].cells[0].text = plan_nacional.get("transformacion", "")
-        table.rows[1].cells[1].text = plan_nacional.get("pilar", "")
-        table.rows[1].cells[2].text = plan_nacional.get("catalizador", "")
-        table.rows[1].cells[3].text = plan_nacional.get("componente", "")
+        self._set_row_text(table.rows[1], [
+            plan_nacional.get(key, "") for key in ("transformacion", "pilar", "catalizador", "componente")
+        ])
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Plan Departamental
         self._add_subsection_title("02 - Plan de Desarrollo Departamental o Sectorial")
@@ -557,18 +1083,10 @@ class MGASubsidiosBuilder:
         p.add_run(self._safe_str(content.get("problema_central", "")))
         
         self._add_subsection_title("Descripción de la situación existente con respecto al problema")
-        desc = self._safe_str(content.get("descripcion_situacion", "")).replace("\\n", "\n")
-        for para in desc.split("\n\n"):
-            p = self.doc.add_paragraph()
-            p.add_run(para)
-            p.paragraph_format.space_after = Pt(6)
+        self._add_text_paragraphs(self._safe_str(content.get("descripcion_situacion", "")))
         
         self._add_subsection_title("Magnitud actual del problema – indicadores de referencia")
-        mag = self._safe_str(content.get("magnitud_problema", "")).replace("\\n", "\n")
-        for para in mag.split("\n\n"):
-            p = self.doc.add_paragraph()
-            p.add_run(para)
-            p.paragraph_format.space_after = Pt(6)
+        self._add_text_paragraphs(self._safe_str(content.get("magnitud_problema", "")))
     
     def _add_page_4_causas_efectos(self, content: dict):
         """Add Page 4 - Causas y Efectos"""
@@ -577,58 +1095,38 @@ class MGASubsidiosBuilder:
         # Causas
         self._add_subsection_title("01 - Causas que generan el problema")
         
-        causas_table = self.doc.add_table(rows=1, cols=2)
-        causas_table.style = 'Table Grid'
-        
-        causas_table.rows[0].cells[0].text = "Causas directas"
-        causas_table.rows[0].cells[1].text = "Causas indirectas"
-        self._set_cell_shading(causas_table.rows[0].cells[0], "0099CC")
-        self._set_cell_shading(causas_table.rows[0].cells[1], "0099CC")
-        for cell in causas_table.rows[0].cells:
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
+        causas_directas = content.get("causas_directas", [])
+        causas_directas = causas_directas if isinstance(causas_directas, list) else []
+        causas_indirectas = content.get("causas_indirectas", [])
+        causas_indirectas = causas_indirectas if isinstance(causas_indirectas, list) else []
         
-        causas_directas = self._safe_list(content.get("causas_directas", []))
-        causas_indirectas = self._safe_list(content.get("causas_indirectas", []))
-        
-        max_rows = max(len(causas_directas), len(causas_indirectas))
-        for i in range(max_rows):
-            row = causas_table.add_row()
-            if i < len(causas_directas):
-                c = causas_directas[i]
-                row.cells[0].text = f"{c.get('numero', '')}. {c.get('causa', '')}"
-            if i < len(causas_indirectas):
-                c = causas_indirectas[i]
-                row.cells[1].text = f"{c.get('numero', '')} {c.get('causa', '')}"
+        rows = [
+            [
+                f"{d.get('numero', '')}. {d.get('causa', '')}" if d is not None else None,
+                f"{i.get('numero', '')} {i.get('causa', '')}" if i is not None else None,
+            ]
+            for d, i in zip_longest(causas_directas, causas_indirectas)
+        ]
+        self._build_table_fast(["Causas directas", "Causas indirectas"], rows)
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Efectos
         self._add_subsection_title("02 - Efectos generados por el problema")
         
-        efectos_table = self.doc.add_table(rows=1, cols=2)
-        efectos_table.style = 'Table Grid'
-        
-        efectos_table.rows[0].cells[0].text = "Efectos directos"
-        efectos_table.rows[0].cells[1].text = "Efectos indirectos"
-        self._set_cell_shading(efectos_table.rows[0].cells[0], "0099CC")
-        self._set_cell_shading(efectos_table.rows[0].cells[1], "0099CC")
-        for cell in efectos_table.rows[0].cells:
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-        
-        efectos_directos = self._safe_list(content.get("efectos_directos", []))
-        efectos_indirectos = self._safe_list(content.get("efectos_indirectos", []))
-        
-        max_rows = max(len(efectos_directos), len(efectos_indirectos))
-        for i in range(max_rows):
-            row = efectos_table.add_row()
-            if i < len(efectos_directos):
-                e = efectos_directos[i]
-                row.cells[0].text = f"{e.get('numero', '')}. {e.get('efecto', '')}"
-            if i < len(efectos_indirectos):
-                e = efectos_indirectos[i]
-                row.cells[1].text = f"{e.get('numero', '')} {e.get('efecto', '')}"
+        efectos_directos = content.get("efectos_directos", [])
+        efectos_directos = efectos_directos if isinstance(efectos_directos, list) else []
+        efectos_indirectos = content.get("efectos_indirectos", [])
+        efectos_indirectos = efectos_indirectos if isinstance(efectos_indirectos, list) else []
+        
+        rows = [
+            [
+                f"{d.get('numero', '')}. {d.get('efecto', '')}" if d is not None else None,
+                f"{i.get('numero', '')} {i.get('efecto', '')}" if i is not None else None,
+            ]
+            for d, i in zip_longest(efectos_directos, efectos_indirectos)
+        ]
+        self._build_table_fast(["Efectos directos", "Efectos indirectos"], rows)
     
     def _add_page_5_participantes(self, content: dict):
         """Add Page 5 - Participantes"""
@@ -639,39 +1137,22 @@ class MGASubsidiosBuilder:
         self._add_subsection_title("01 - Identificación de los participantes")
         
         # Participants table
-        table = self.doc.add_table(rows=1, cols=2)
-        table.style = 'Table Grid'
-        
-        table.rows[0].cells[0].text = "Participante"
-        table.rows[0].cells[1].text = "Contribución o Gestión"
-        self._set_cell_shading(table.rows[0].cells[0], "0099CC")
-        self._set_cell_shading(table.rows[0].cells[1], "0099CC")
-        for cell in table.rows[0].cells:
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-        
-        for part in self._safe_list(content.get("participantes", [])):
-            row = table.add_row()
-            
-            # Left cell - participant details
+        rows = []
+        participantes = content.get("participantes", [])
+        for part in participantes if isinstance(participantes, list) else []:
+            # Left cell - participant details, right cell - contribution
             cell_text = f"Actor: {part.get('actor', '')}\n"
             cell_text += f"Entidad: {part.get('entidad', '')}\n"
             cell_text += f"Posición: {part.get('posicion', '')}\n"
             cell_text += f"Intereses o Expectativas: {part.get('intereses', '')}"
-            row.cells[0].text = cell_text
-            
-            # Right cell - contribution
-            row.cells[1].text = part.get("contribucion", "")
+            rows.append([cell_text, part.get("contribucion", "")])
+        self._build_table_fast(["Participante", "Contribución o Gestión"], rows)
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Análisis
         self._add_subsection_title("02 - Análisis de los participantes")
-        analisis = self._safe_str(content.get("analisis_participantes", "")).replace("\\n", "\n")
-        for para in analisis.split("\n\n"):
-            p = self.doc.add_paragraph()
-            p.add_run(para)
-            p.paragraph_format.space_after = Pt(6)
+        self._add_text_paragraphs(self._safe_str(content.get("analisis_participantes", "")))
     
     def _add_page_6_poblacion(self, content: dict):
         """Add Page 6 - Población"""
@@ -685,34 +1166,9 @@ class MGASubsidiosBuilder:
         self._add_field("Número", str(pob_afectada.get("numero", "")))
         self._add_field("Fuente de la información", pob_afectada.get("fuente", ""))
         
-        # Extract location data (handle both nested and flat structure)
-        # Fallback to self._data (form input) if AI doesn't provide location
-        loc_afectada = pob_afectada.get("localizacion", {})
-        region_afectada = loc_afectada.get("region", "") or pob_afectada.get("region", "") or "Caribe"
-        dept_afectada = loc_afectada.get("departamento", "") or pob_afectada.get("departamento", "") or self._data.get("departamento", "")
-        mun_afectada = loc_afectada.get("municipio", "") or pob_afectada.get("municipio", "") or self._data.get("municipio", "")
-        tipo_agrup_afectada = loc_afectada.get("tipo_agrupacion", "") or pob_afectada.get("tipo_agrupacion", "") or "Urbana"
-        agrup_afectada = loc_afectada.get("agrupacion", "") or pob_afectada.get("agrupacion", "") or self._data.get("municipio", "")
-        
-        # Localización table
-        self._add_subsection_title("Localización")
-        table = self.doc.add_table(rows=5, cols=2)
-        table.style = 'Table Grid'
-        
-        table.rows[0].cells[0].text = "Ubicación general"
-        table.rows[0].cells[1].text = "Localización específica/Otro tipo de entidad étnica"
-        self._set_cell_shading(table.rows[0].cells[0], "0099CC")
-        self._set_cell_shading(table.rows[0].cells[1], "0099CC")
-        for cell in table.rows[0].cells:
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-        
-        table.rows[1].cells[0].text = f"Región: {region_afectada}"
-        table.rows[2].cells[0].text = f"Departamento: {dept_afectada}"
-        table.rows[3].cells[0].text = f"Municipio: {mun_afectada}"
-        table.rows[4].cells[0].text = f"Tipo de Agrupación: {tipo_agrup_afectada}\nAgrupación: {agrup_afectada}"
+        self._add_localizacion_table(pob_afectada)
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Población objetivo
         self._add_subsection_title("02 - Población objetivo de la intervención")
@@ -722,32 +1178,31 @@ class MGASubsidiosBuilder:
         self._add_field("Número", str(pob_objetivo.get("numero", "")))
         self._add_field("Fuente de la información", pob_objetivo.get("fuente", ""))
         
+        self._add_localizacion_table(pob_objetivo, with_consejo_col=True)
+    
+    def _add_localizacion_table(self, pob: dict, with_consejo_col: bool = False):
+        """Add the 'Localización' table for a population block (afectada / objetivo)"""
         # Extract location data (handle both nested and flat structure)
         # Fallback to self._data (form input) if AI doesn't provide location
-        loc_objetivo = pob_objetivo.get("localizacion", {})
-        region_objetivo = loc_objetivo.get("region", "") or pob_objetivo.get("region", "") or "Caribe"
-        dept_objetivo = loc_objetivo.get("departamento", "") or pob_objetivo.get("departamento", "") or self._data.get("departamento", "")
-        mun_objetivo = loc_objetivo.get("municipio", "") or pob_objetivo.get("municipio", "") or self._data.get("municipio", "")
-        tipo_agrup_objetivo = loc_objetivo.get("tipo_agrupacion", "") or pob_objetivo.get("tipo_agrupacion", "") or "Urbana"
-        agrup_objetivo = loc_objetivo.get("agrupacion", "") or pob_objetivo.get("agrupacion", "") or self._data.get("municipio", "")
-        
-        # Localización table for objetivo
+        loc = pob.get("localizacion", {})
+        region = loc.get("region", "") or pob.get("region", "") or "Caribe"
+        dept = loc.get("departamento", "") or pob.get("departamento", "") or self._data.get("departamento", "")
+        mun = loc.get("municipio", "") or pob.get("municipio", "") or self._data.get("municipio", "")
+        tipo_agrup = loc.get("tipo_agrupacion", "") or pob.get("tipo_agrupacion", "") or "Urbana"
+        agrup = loc.get("agrupacion", "") or pob.get("agrupacion", "") or self._data.get("municipio", "")
+        
+        headers = ["Ubicación general", "Localización específica/Otro tipo de entidad étnica"]
+        if with_consejo_col:
+            headers.append("Nombre del consejo comunitario")
+        empty = [None] * (len(headers) - 1)
+        
         self._add_subsection_title("Localización")
-        table2 = self.doc.add_table(rows=5, cols=3)
-        table2.style = 'Table Grid'
-        
-        table2.rows[0].cells[0].text = "Ubicación general"
-        table2.rows[0].cells[1].text = "Localización específica/Otro tipo de entidad étnica"
-        table2.rows[0].cells[2].text = "Nombre del consejo comunitario"
-        for i in range(3):
-            self._set_cell_shading(table2.rows[0].cells[i], "0099CC")
-            for run in table2.rows[0].cells[i].paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-        
-        table2.rows[1].cells[0].text = f"Región: {region_objetivo}"
-        table2.rows[2].cells[0].text = f"Departamento: {dept_objetivo}"
-        table2.rows[3].cells[0].text = f"Municipio: {mun_objetivo}"
-        table2.rows[4].cells[0].text = f"Tipo de Agrupación: {tipo_agrup_objetivo}\nAgrupación: {agrup_objetivo}"
+        self._build_table_fast(headers, [
+            [f"Región: {region}", *empty],
+            [f"Departamento: {dept}", *empty],
+            [f"Municipio: {mun}", *empty],
+            [f"Tipo de Agrupación: {tipo_agrup}\nAgrupación: {agrup}", *empty],
+        ])
     
     def _add_page_7_objetivos(self, content: dict):
         """Add Page 7 - Objetivos"""
@@ -765,46 +1220,31 @@ class MGASubsidiosBuilder:
         
         indicadores = content.get("indicadores", [])
         if indicadores:
-            table = self.doc.add_table(rows=1, cols=3)
-            table.style = 'Table Grid'
-            
-            table.rows[0].cells[0].text = "Indicador objetivo"
-            table.rows[0].cells[1].text = "Descripción"
-            table.rows[0].cells[2].text = "Fuente de verificación"
-            for cell in table.rows[0].cells:
-                self._set_cell_shading(cell, "0099CC")
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-            
-            for ind in indicadores:
-                row = table.add_row()
-                row.cells[0].text = ind.get("nombre", "")
-                row.cells[1].text = f"Medido a través de: {ind.get('medido', '')}\nMeta: {ind.get('meta', '')}\nTipo de fuente: {ind.get('tipo_fuente', '')}"
-                row.cells[2].text = ind.get("fuente_verificacion", "")
-        
-        self.doc.add_paragraph()
+            self._build_table_fast(
+                ["Indicador objetivo", "Descripción", "Fuente de verificación"],
+                [
+                    [
+                        ind.get("nombre", ""),
+                        f"Medido a través de: {ind.get('medido', '')}\nMeta: {ind.get('meta', '')}\nTipo de fuente: {ind.get('tipo_fuente', '')}",
+                        ind.get("fuente_verificacion", ""),
+                    ]
+                    for ind in indicadores
+                ],
+            )
+        
+        self._add_spacer()
         
         # Relación causas-objetivos
         self._add_subsection_title("02 - Relaciones entre las causas y objetivos")
         
         relaciones = content.get("relacion_causas_objetivos", [])
         if relaciones:
-            table2 = self.doc.add_table(rows=1, cols=2)
-            table2.style = 'Table Grid'
-            
-            table2.rows[0].cells[0].text = "Causa relacionada"
-            table2.rows[0].cells[1].text = "Objetivos específicos"
-            for cell in table2.rows[0].cells:
-                self._set_cell_shading(cell, "0099CC")
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-            
-            for rel in relaciones:
-                row = table2.add_row()
-                row.cells[0].text = rel.get("causa", "")
-                row.cells[1].text = rel.get("objetivo", "")
+            self._build_table_fast(
+                ["Causa relacionada", "Objetivos específicos"],
+                [[rel.get("causa", ""), rel.get("objetivo", "")] for rel in relaciones],
+            )
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Alternativas
         self._add_section_title("Alternativas de la solución")
@@ -812,35 +1252,20 @@ class MGASubsidiosBuilder:
         
         alternativas = content.get("alternativas", [])
         if alternativas:
-            table3 = self.doc.add_table(rows=1, cols=3)
-            table3.style = 'Table Grid'
-            
-            table3.rows[0].cells[0].text = "Nombre de la alternativa"
-            table3.rows[0].cells[1].text = "Se evaluará con esta herramienta"
-            table3.rows[0].cells[2].text = "Estado"
-            for cell in table3.rows[0].cells:
-                self._set_cell_shading(cell, "0099CC")
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-            
-            for alt in alternativas:
-                row = table3.add_row()
-                row.cells[0].text = alt.get("nombre", "")
-                row.cells[1].text = alt.get("evaluacion", "")
-                row.cells[2].text = alt.get("estado", "")
+            self._build_table_fast(
+                ["Nombre de la alternativa", "Se evaluará con esta herramienta", "Estado"],
+                [[alt.get("nombre", ""), alt.get("evaluacion", ""), alt.get("estado", "")] for alt in alternativas],
+            )
         
         # Evaluaciones
         self._add_subsection_title("Evaluaciones a realizar")
         evaluaciones = content.get("evaluaciones", {})
         
-        table4 = self.doc.add_table(rows=3, cols=2)
-        table4.style = 'Table Grid'
-        table4.rows[0].cells[0].text = "Rentabilidad:"
-        table4.rows[0].cells[1].text = evaluaciones.get("rentabilidad", "Si")
-        table4.rows[1].cells[0].text = "Costo - Eficiencia y Costo mínimo:"
-        table4.rows[1].cells[1].text = evaluaciones.get("costo_eficiencia", "Si")
-        table4.rows[2].cells[0].text = "Evaluación multicriterio:"
-        table4.rows[2].cells[1].text = evaluaciones.get("multicriterio", "No")
+        table4 = self._add_grid_table(rows=3, cols=2)
+        rows = table4.rows
+        self._set_row_text(rows[0], ["Rentabilidad:", evaluaciones.get("rentabilidad", "Si")])
+        self._set_row_text(rows[1], ["Costo - Eficiencia y Costo mínimo:", evaluaciones.get("costo_eficiencia", "Si")])
+        self._set_row_text(rows[2], ["Evaluación multicriterio:", evaluaciones.get("multicriterio", "No")])
     
     def _add_estudio_necesidades_servicio(self, servicio_data: dict, servicio_nombre: str):
         """Add estudio de necesidades for a service"""
@@ -851,7 +1276,7 @@ class MGASubsidiosBuilder:
         p = self.doc.add_paragraph()
         run = p.add_run(f"Alternativa 1. {nombre_proyecto}")
         run.bold = True
-        run.font.size = Pt(10)
+        run.font.size = SIZE_10PT
         
         self._add_section_title("Estudio de necesidades")
         self._add_subsection_title("01 - Bien o servicio")
@@ -865,60 +1290,34 @@ class MGASubsidiosBuilder:
         # Oferta/Demanda table
         tabla_od = servicio_data.get("tabla_oferta_demanda", [])
         if tabla_od:
-            table = self.doc.add_table(rows=1, cols=4)
-            table.style = 'Table Grid'
-            table.autofit = False
-            
-            # Set column widths for better display
-            col_widths = [Inches(1.2), Inches(1.5), Inches(1.5), Inches(1.5)]
-            for i, width in enumerate(col_widths):
-                for cell in table.columns[i].cells:
-                    cell.width = width
-            
-            headers = ["Año", "Oferta", "Demanda", "Déficit"]
-            for i, h in enumerate(headers):
-                cell = table.rows[0].cells[i]
-                cell.text = h
-                cell.width = col_widths[i]
-                self._set_cell_shading(cell, "0099CC")
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-                    run.font.bold = True
-                cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            for idx, item in enumerate(tabla_od):
-                row = table.add_row()
-                row.cells[0].text = str(item.get("ano", ""))
-                row.cells[1].text = str(item.get("oferta", ""))
-                row.cells[2].text = str(item.get("demanda", ""))
-                row.cells[3].text = str(item.get("deficit", ""))
-                
-                # Alternating row colors (light blue for odd rows, white for even)
-                if idx % 2 == 0:
-                    for cell in row.cells:
-                        self._set_cell_shading(cell, "E8F4F8")  # Light blue
-                
-                for cell in row.cells:
-                    for para in cell.paragraphs:
-                        para.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+            self._build_table_fast(
+                ["Año", "Oferta", "Demanda", "Déficit"],
+                [
+                    [str(item.get(key, "")) for key in ("ano", "oferta", "demanda", "deficit")]
+                    for item in tabla_od
+                ],
+                col_widths=[Inches(w).twips for w in (1.2, 1.5, 1.5, 1.5)],
+                header_bold=True,
+                header_align="center",
+                align="right",
+                band_fill="E8F4F8",  # Light blue on alternating rows
+            )
     
     def _add_pages_6_11(self, content: dict):
         """Add pages 6-11"""
         # Page 6 - Población
         self._add_page_6_poblacion(content.get("pagina_6_poblacion", {}))
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Page 7 - Objetivos
         self._add_page_7_objetivos(content.get("pagina_7_objetivos", {}))
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Pages 8-11 - Estudio de Necesidades
-        estudio = content.get("pagina_8_9_10_11_estudio_necesidades", {})
-        
         # Use servicio_principal (main service) - this matches the prompt output
-        servicio_principal = estudio.get("servicio_principal", {})
+        servicio_principal = _dig(content, ESTUDIO_SERVICIO_PRINCIPAL, {})
         if servicio_principal:
             self._add_estudio_necesidades_servicio(servicio_principal, "Principal")
     
@@ -930,8 +1329,8 @@ class MGASubsidiosBuilder:
         nombre_proyecto = self._data.get("nombre_proyecto", "")
         p = self.doc.add_paragraph()
         run = p.add_run(f"Alternativa: {nombre_proyecto}")
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(100, 100, 100)
+        run.font.size = SIZE_9PT
+        run.font.color.rgb = DARK_GREY
         
         self._add_section_title("Análisis técnico de la alternativa")
         self._add_subsection_title("01 - Análisis técnico de la alternativa")
@@ -939,8 +1338,8 @@ class MGASubsidiosBuilder:
         # Green label for subsection
         p = self.doc.add_paragraph()
         run = p.add_run("Análisis técnico de la alternativa")
-        run.font.color.rgb = RGBColor(0, 128, 0)
-        run.font.size = Pt(11)
+        run.font.color.rgb = GREEN
+        run.font.size = SIZE_11PT
         
         # Main description
         p = self.doc.add_paragraph()
@@ -967,8 +1366,8 @@ class MGASubsidiosBuilder:
         nombre_proyecto = self._data.get("nombre_proyecto", "")
         p = self.doc.add_paragraph()
         run = p.add_run(f"Alternativa: {nombre_proyecto}")
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(100, 100, 100)
+        run.font.size = SIZE_9PT
+        run.font.color.rgb = DARK_GREY
         
         self._add_section_title("Localización de la alternativa")
         self._add_subsection_title("01 - Localización de la alternativa")
@@ -980,26 +1379,19 @@ class MGASubsidiosBuilder:
         departamento = ubicacion.get('departamento', '') or self._data.get('departamento', '')
         municipio = ubicacion.get('municipio', '') or self._data.get('municipio', '')
         
-        table = self.doc.add_table(rows=8, cols=2)
-        table.style = 'Table Grid'
+        table = self._add_grid_table(rows=8, cols=2)
         
-        table.rows[0].cells[0].text = "Ubicación general"
-        table.rows[0].cells[1].text = "Ubicación específica"
-        for cell in table.rows[0].cells:
-            self._set_cell_shading(cell, "0099CC")
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
+        self._style_header_row(table.rows[0], ["Ubicación general", "Ubicación específica"])
         
         # Fill general location (column 0) with fallback to input data
-        table.rows[1].cells[0].text = f"Región: {region}"
-        table.rows[2].cells[0].text = f"Departamento: {departamento}"
-        table.rows[3].cells[0].text = f"Municipio: {municipio}"
-        table.rows[4].cells[0].text = f"Tipo de Agrupación:"
-        table.rows[5].cells[0].text = f"Agrupación:"
-        table.rows[6].cells[0].text = f"Latitud:"
-        table.rows[7].cells[0].text = f"Longitud:"
+        general = [
+            f"Región: {region}", f"Departamento: {departamento}", f"Municipio: {municipio}",
+            "Tipo de Agrupación:", "Agrupación:", "Latitud:", "Longitud:",
+        ]
+        for row, text in zip(table.rows[1:], general):
+            self._set_row_text(row, [text])
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Factores analizados
         self._add_subsection_title("02 - Factores analizados")
@@ -1027,8 +1419,8 @@ class MGASubsidiosBuilder:
         nombre_proyecto = self._data.get("nombre_proyecto", "")
         p = self.doc.add_paragraph()
         run = p.add_run(f"Alternativa: {nombre_proyecto}")
-        run.font.size = Pt(9)
-        run.font.color.rgb = RGBColor(100, 100, 100)
+        run.font.size = SIZE_9PT
+        run.font.color.rgb = DARK_GREY
         
         self._add_section_title("Cadena de valor de la alternativa")
         
@@ -1060,6 +1452,10 @@ class MGASubsidiosBuilder:
             if obj:
                 objetivos = [obj]
         
+        # Fallback products for objectives without their own (top level, then single producto)
+        single_prod = content.get("producto", {})
+        fallback_productos = top_level_productos or ([single_prod] if single_prod else [])
+        
         for obj in objetivos:
             # Objetivo header
             num = obj.get('numero', '1')
@@ -1069,31 +1465,17 @@ class MGASubsidiosBuilder:
             p = self.doc.add_paragraph()
             p.add_run(obj.get("descripcion", ""))
             
-            self.doc.add_paragraph()
+            self._add_spacer()
             
             # Products for this objective (try obj.productos, then top_level, then fallback)
-            productos = obj.get("productos", [])
-            if not productos:
-                productos = top_level_productos
-            if not productos:
-                # Fallback to single producto from content
-                single_prod = content.get("producto", {})
-                if single_prod:
-                    productos = [single_prod]
+            productos = obj.get("productos", []) or fallback_productos
             
             # Create ONE table for all products in this objective
             if productos:
-                table = self.doc.add_table(rows=1, cols=2)
-                table.style = 'Table Grid'
+                table = self._add_grid_table(rows=1, cols=2)
                 
                 # Header row
-                table.rows[0].cells[0].text = "Producto"
-                table.rows[0].cells[1].text = "Actividad y/o Entregable"
-                for cell in table.rows[0].cells:
-                    self._set_cell_shading(cell, "0099CC")
-                    for run in cell.paragraphs[0].runs:
-                        run.font.color.rgb = RGBColor(255, 255, 255)
-                        run.font.bold = True
+                self._style_header_row(table.rows[0], ["Producto", "Actividad y/o Entregable"], bold=True)
                 
                 for idx, producto in enumerate(productos):
                     row = table.add_row()
@@ -1106,38 +1488,31 @@ class MGASubsidiosBuilder:
                     codigo = producto.get('codigo', f'1.{idx+1}')
                     nombre = producto.get('nombre', '')
                     complemento = producto.get('complemento', '') or producto.get('complemento_info', '')
+                    principal = f"    {complemento}  (Producto principal del proyecto)\n\n" if complemento else "\n"
                     
-                    prod_text = f"{codigo} {nombre}\n"
-                    if complemento:
-                        prod_text += f"    {complemento}  (Producto principal del proyecto)\n\n"
-                    else:
-                        prod_text += "\n"
-                    prod_text += f"Complemento:\n"
-                    prod_text += f"Medido a través de: {producto.get('medido', '') or producto.get('unidad', '')}\n"
-                    prod_text += f"Cantidad: {producto.get('cantidad', '')}\n"
-                    prod_text += f"Costo: $ {producto.get('costo', '')}\n"
-                    prod_text += f"Etapa: {producto.get('etapa', 'Inversión')}\n"
-                    prod_text += f"Localización:\n"
-                    prod_text += f"Número de Personas: {producto.get('personas', '') or producto.get('num_personas', '')}\n"
-                    prod_text += f"Acumulativo o no: {producto.get('acumulativo', 'No Acumulativo')}\n"
-                    prod_text += f"Población Beneficiaria: {producto.get('poblacion_beneficiaria', '')}"
-                    row.cells[0].text = prod_text
+                    row.cells[0].text = (
+                        f"{codigo} {nombre}\n{principal}"
+                        "Complemento:\n"
+                        f"Medido a través de: {producto.get('medido', '') or producto.get('unidad', '')}\n"
+                        f"Cantidad: {producto.get('cantidad', '')}\n"
+                        f"Costo: $ {producto.get('costo', '')}\n"
+                        f"Etapa: {producto.get('etapa', 'Inversión')}\n"
+                        "Localización:\n"
+                        f"Número de Personas: {producto.get('personas', '') or producto.get('num_personas', '')}\n"
+                        f"Acumulativo o no: {producto.get('acumulativo', 'No Acumulativo')}\n"
+                        f"Población Beneficiaria: {producto.get('poblacion_beneficiaria', '')}"
+                    )
                     
                     # Right cell - actividades for this product
-                    prod_actividades = producto.get("actividades", [])
-                    if not prod_actividades:
-                        prod_actividades = top_level_actividades or content.get("actividades", [])
-                    
-                    act_text = ""
-                    for act in prod_actividades:
-                        act_codigo = act.get('codigo', '')
-                        act_nombre = act.get('nombre', '') or act.get('descripcion', '')
-                        act_text += f"{act_codigo} {act_nombre}\n\n"
-                        act_text += f"Costo: $ {act.get('costo', '')}\n"
-                        act_text += f"Etapa: {act.get('etapa', 'Inversión')}\n\n"
-                    row.cells[1].text = act_text
+                    prod_actividades = producto.get("actividades", []) or top_level_actividades
+                    row.cells[1].text = "".join(
+                        f"{act.get('codigo', '')} {act.get('nombre', '') or act.get('descripcion', '')}\n\n"
+                        f"Costo: $ {act.get('costo', '')}\n"
+                        f"Etapa: {act.get('etapa', 'Inversión')}\n\n"
+                        for act in prod_actividades
+                    )
                 
-                self.doc.add_paragraph()
+                self._add_spacer()
     
     def _add_page_15_actividades_detalle(self, content: dict):
         """Add Page 15 - Actividades Detalle"""
@@ -1151,45 +1526,31 @@ class MGASubsidiosBuilder:
             act_desc = act.get('descripcion', act.get('nombre', ''))
             run = p.add_run(f"Actividad {act.get('codigo', '')} {act_desc}")
             run.bold = True
-            run.font.size = Pt(10)
+            run.font.size = SIZE_10PT
             
             # Periodo table
-            table = self.doc.add_table(rows=1, cols=2)
-            table.style = 'Table Grid'
-            
-            table.rows[0].cells[0].text = "Periodo"
-            table.rows[0].cells[1].text = "Servicios domiciliarios"
-            for cell in table.rows[0].cells:
-                self._set_cell_shading(cell, "0099CC")
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
+            table = self._add_grid_table(rows=1, cols=2)
             
-            for periodo in self._safe_list(act.get("periodos", [])):
-                row = table.add_row()
-                row.cells[0].text = str(periodo.get("periodo", "1"))
-                row.cells[1].text = periodo.get("valor", "")
+            self._style_header_row(table.rows[0], ["Periodo", "Servicios domiciliarios"])
             
-            row_total = table.add_row()
-            row_total.cells[0].text = "Total"
-            self._set_cell_shading(row_total.cells[0], "7FC8D8")
-            row_total.cells[1].text = act.get("total", "")
+            periodos = act.get("periodos", [])
+            rows = [
+                (str(periodo.get("periodo", "1")), periodo.get("valor", ""))
+                for periodo in (periodos if isinstance(periodos, list) else [])
+            ]
+            rows.append(("Total", act.get("total", "")))
+            total_tr = self._append_rows_bulk(table, rows)[-1]
+            total_tr.tc_lst[0].get_or_add_tcPr().append(deepcopy(_shading("7FC8D8")))
             
-            self.doc.add_paragraph()
+            self._add_spacer()
             
             # Total table
-            table2 = self.doc.add_table(rows=2, cols=2)
-            table2.style = 'Table Grid'
-            table2.rows[0].cells[0].text = "Periodo"
-            table2.rows[0].cells[1].text = "Total"
-            for cell in table2.rows[0].cells:
-                self._set_cell_shading(cell, "0099CC")
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
+            table2 = self._add_grid_table(rows=2, cols=2)
+            self._style_header_row(table2.rows[0], ["Periodo", "Total"])
             
-            table2.rows[1].cells[0].text = "1"
-            table2.rows[1].cells[1].text = act.get("total", "")
+            self._set_row_text(table2.rows[1], ["1", act.get("total", "")])
             
-            self.doc.add_paragraph()
+            self._add_spacer()
     
     def _add_page_16_riesgos(self, content: dict):
         """Add Page 16 - Riesgos with 6-column structure including hierarchy level"""
@@ -1199,8 +1560,7 @@ class MGASubsidiosBuilder:
         self._add_subsection_title("01 - Análisis de riesgo")
         
         # Riesgos table - 6 columns with level indicator
-        table = self.doc.add_table(rows=1, cols=6)
-        table.style = 'Table Grid'
+        table = self._add_grid_table(rows=1, cols=6)
         table.autofit = False
         
         # Set column widths (in inches) - total ~7 inches for letter size with margins
@@ -1212,15 +1572,7 @@ class MGASubsidiosBuilder:
         
         # Header row
         headers = ["", "Tipo de riesgo", "Descripción del riesgo", "Probabilidad e impacto", "Efectos", "Medidas de mitigación"]
-        for i, h in enumerate(headers):
-            cell = table.rows[0].cells[i]
-            cell.text = h
-            cell.width = col_widths[i]
-            self._set_cell_shading(cell, "0099CC")
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-                run.font.size = Pt(8)
-                run.font.bold = True
+        self._style_header_row(table.rows[0], headers, font_size=8, bold=True)
         
         riesgos = content.get("riesgos", [])
         current_level = None
@@ -1238,51 +1590,44 @@ class MGASubsidiosBuilder:
                     if i > 0:  # Don't shade level column here
                         self._set_cell_shading(cell, "E8F4F8")  # Light blue
             
+            # Level | type | description | probability and impact | effects | mitigation
+            prob = riesgo.get('probabilidad', '')
+            imp = riesgo.get('impacto', '')
+            self._set_row_text(row, [
+                nivel,
+                riesgo.get('tipo', 'Administrativos'),
+                _unescape_newlines(riesgo.get('descripcion', '')),
+                f"Probabilidad:\n{prob}\n\nImpacto: {imp}",
+                riesgo.get('efectos', ''),
+                riesgo.get('mitigacion', ''),
+            ])
+            
             # Level column (first column) - teal/green shading
-            row.cells[0].text = nivel
             self._set_cell_shading(row.cells[0], "7FC8A8")  # Teal/green color
             for para in row.cells[0].paragraphs:
                 for run in para.runs:
-                    run.font.size = Pt(7)
+                    run.font.size = SIZE_7PT
                     run.font.bold = True
             
-            # Type column
-            row.cells[1].text = riesgo.get('tipo', 'Administrativos')
-            
-            # Description column
-            desc = riesgo.get('descripcion', '')
-            row.cells[2].text = desc.replace('\\n', '\n')
-            
-            # Probability and impact column
-            prob = riesgo.get('probabilidad', '')
-            imp = riesgo.get('impacto', '')
-            row.cells[3].text = f"Probabilidad:\n{prob}\n\nImpacto: {imp}"
-            
-            # Effects column
-            row.cells[4].text = riesgo.get('efectos', '')
-            
-            # Mitigation column
-            row.cells[5].text = riesgo.get('mitigacion', '')
-            
             # Apply consistent font size to all cells
             for cell in row.cells:
                 for para in cell.paragraphs:
                     for run in para.runs:
-                        run.font.size = Pt(8)
+                        run.font.size = SIZE_8PT
     
     def _add_pages_12_16(self, content: dict):
         """Add pages 12-16"""
         # Page 12 - Análisis Técnico (includes localization info)
         self._add_page_12_analisis_tecnico(content.get("pagina_12_analisis_tecnico", {}))
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Page 13/14 - Cadena de Valor (this is the main products/activities table)
         # Prompt generates this as pagina_13_cadena_valor
         cadena_data = content.get("pagina_13_cadena_valor") or content.get("pagina_14_cadena_valor", {})
         self._add_page_14_cadena_valor(cadena_data)
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Page 15/16 - Riesgos (comes AFTER Cadena de Valor)
         # Prompt generates this as pagina_14_riesgos
@@ -1303,26 +1648,22 @@ class MGASubsidiosBuilder:
             p.add_run(riesgo.get("descripcion_riesgo", ""))
             
             # Add risk table with 4 columns
-            table = self.doc.add_table(rows=1, cols=4)
-            table.style = 'Table Grid'
+            table = self._add_grid_table(rows=1, cols=4)
             
             # Header row
             headers = ["Tipo", "Probabilidad/Impacto", "Efectos", "Mitigación"]
-            for i, h in enumerate(headers):
-                table.rows[0].cells[i].text = h
-                self._set_cell_shading(table.rows[0].cells[i], "0099CC")
-                for run in table.rows[0].cells[i].paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-                    run.font.size = Pt(8)
+            self._style_header_row(table.rows[0], headers, font_size=8)
             
             # Data row
             row = table.add_row()
-            row.cells[0].text = riesgo.get("tipo", "")
-            row.cells[1].text = f"Probabilidad: {riesgo.get('probabilidad', '')}\n\nImpacto: {riesgo.get('impacto', '')}"
-            row.cells[2].text = riesgo.get("efectos", "")
-            row.cells[3].text = riesgo.get("mitigacion", "")
-            
-            self.doc.add_paragraph()
+            self._set_row_text(row, [
+                riesgo.get("tipo", ""),
+                f"Probabilidad: {riesgo.get('probabilidad', '')}\n\nImpacto: {riesgo.get('impacto', '')}",
+                riesgo.get("efectos", ""),
+                riesgo.get("mitigacion", ""),
+            ])
+            
+            self._add_spacer()
     
     def _add_page_18_19_ingresos_beneficios(self, content: dict):
         """Add Pages 18-19 - Ingresos y Beneficios with multiple benefit items"""
@@ -1349,78 +1690,46 @@ class MGASubsidiosBuilder:
         
         for beneficio in beneficios:
             # Benefit title
-            self.doc.add_paragraph()
+            self._add_spacer()
             p = self.doc.add_paragraph()
             p.add_run(beneficio.get("titulo", ""))
             
-            # Fields without labels in gray boxes (inline style)
-            p = self.doc.add_paragraph()
-            p.add_run(f"Tipo: ").bold = True
-            p.add_run(beneficio.get("tipo", "Beneficios"))
-            
-            p = self.doc.add_paragraph()
-            p.add_run(f"Medido a través de: ").bold = True
-            p.add_run(beneficio.get("medido", "Número"))
-            
-            p = self.doc.add_paragraph()
-            p.add_run(f"Bien producido: ").bold = True
-            p.add_run(beneficio.get("bien_producido", ""))
-            
-            p = self.doc.add_paragraph()
-            p.add_run(f"Razón Precio Cuenta (RPC): ").bold = True
-            p.add_run(beneficio.get("razon_precio_cuenta", ""))
-            
-            p = self.doc.add_paragraph()
-            p.add_run(f"Descripción Cantidad: ").bold = True
-            p.add_run(beneficio.get("descripcion_cantidad", ""))
-            
-            p = self.doc.add_paragraph()
-            p.add_run(f"Descripción Valor Unitario: ").bold = True
-            p.add_run(beneficio.get("descripcion_valor_unitario", ""))
+            # "Label: value" lines with a bold label
+            self._add_fields_block([
+                (label, self._safe_str(beneficio.get(key, default)))
+                for label, key, default in BENEFICIO_FIELDS
+            ])
             
             # Periodos table for this benefit
             tabla_periodos = beneficio.get("tabla_periodos", [])
             if tabla_periodos:
-                table = self.doc.add_table(rows=1, cols=4)
-                table.style = 'Table Grid'
+                table = self._add_grid_table(rows=1, cols=4)
                 
                 headers = ["Periodo", "Cantidad", "Valor unitario", "Valor total"]
-                for i, h in enumerate(headers):
-                    table.rows[0].cells[i].text = h
-                    self._set_cell_shading(table.rows[0].cells[i], "0099CC")
-                    for run in table.rows[0].cells[i].paragraphs[0].runs:
-                        run.font.color.rgb = RGBColor(255, 255, 255)
-                        run.font.size = Pt(9)
+                self._style_header_row(table.rows[0], headers, font_size=9)
                 
-                for item in tabla_periodos:
-                    row = table.add_row()
-                    row.cells[0].text = str(item.get("periodo", ""))
-                    row.cells[1].text = str(item.get("cantidad", ""))
-                    row.cells[2].text = str(item.get("valor_unitario", ""))
-                    row.cells[3].text = str(item.get("valor_total", ""))
+                self._append_rows_bulk(table, [
+                    (str(item.get("periodo", "")), str(item.get("cantidad", "")),
+                     str(item.get("valor_unitario", "")), str(item.get("valor_total", "")))
+                    for item in tabla_periodos
+                ])
             
-            self.doc.add_paragraph()
+            self._add_spacer()
         
         # Totales section
         self._add_subsection_title("02 - Totales")
         
         tabla_totales = content.get("tabla_totales", [])
         if tabla_totales:
-            table2 = self.doc.add_table(rows=1, cols=3)
-            table2.style = 'Table Grid'
+            table2 = self._add_grid_table(rows=1, cols=3)
             
-            headers = ["Periodo", "Total beneficios", "Total"]
-            for i, h in enumerate(headers):
-                table2.rows[0].cells[i].text = h
-                self._set_cell_shading(table2.rows[0].cells[i], "0099CC")
-                for run in table2.rows[0].cells[i].paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
+            self._style_header_row(table2.rows[0], ["Periodo", "Total beneficios", "Total"])
             
-            for item in tabla_totales:
-                row = table2.add_row()
-                row.cells[0].text = str(item.get("periodo", ""))
-                row.cells[1].text = str(item.get("total_beneficios", ""))
-                row.cells[2].text = str(item.get("total", ""))
+            self._append_rows_bulk(table2, [
+                (str(item.get("periodo", "")), str(item.get("total_beneficios", "")),
+                 str(item.get("total", "")))
+                for item in tabla_totales
+            ])
     
     def _add_page_20_flujo_economico(self, content: dict):
         """Add Page 20 - Flujo Económico with 10-column table"""
@@ -1435,32 +1744,29 @@ class MGASubsidiosBuilder:
         
         flujo = content.get("flujo", [])
         if flujo:
-            table = self.doc.add_table(rows=1, cols=10)
-            table.style = 'Table Grid'
+            table = self._add_grid_table(rows=1, cols=10)
             
             headers = ["P", "Beneficios e ingresos (+)", "Créditos(+)", "Costos de preinversión (-)", 
                       "Costos de inversión (-)", "Costos de operación (-)", "Amortización (-)", 
                       "Intereses de los créditos (-)", "Valor de salvamento (+)", "Flujo Neto"]
             
-            for i, h in enumerate(headers):
-                table.rows[0].cells[i].text = h
-                self._set_cell_shading(table.rows[0].cells[i], "0099CC")
-                for run in table.rows[0].cells[i].paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255, 255, 255)
-                    run.font.size = Pt(7)
-            
-            for item in flujo:
-                row = table.add_row()
-                row.cells[0].text = str(item.get("p", ""))
-                row.cells[1].text = str(item.get("beneficios", ""))
-                row.cells[2].text = str(item.get("creditos", "$0,0"))
-                row.cells[3].text = str(item.get("costos_preinversion", "$0,0"))
-                row.cells[4].text = str(item.get("costos_inversion", ""))
-                row.cells[5].text = str(item.get("costos_operacion", "$0,0"))
-                row.cells[6].text = str(item.get("amortizacion", "$0,0"))
-                row.cells[7].text = str(item.get("intereses", "$0,0"))
-                row.cells[8].text = str(item.get("valor_salvamento", "$0,0"))
-                row.cells[9].text = str(item.get("flujo_neto", ""))
+            self._style_header_row(table.rows[0], headers, font_size=7)
+            
+            self._append_rows_bulk(table, [
+                (
+                    str(item.get("p", "")),
+                    str(item.get("beneficios", "")),
+                    str(item.get("creditos", "$0,0")),
+                    str(item.get("costos_preinversion", "$0,0")),
+                    str(item.get("costos_inversion", "")),
+                    str(item.get("costos_operacion", "$0,0")),
+                    str(item.get("amortizacion", "$0,0")),
+                    str(item.get("intereses", "$0,0")),
+                    str(item.get("valor_salvamento", "$0,0")),
+                    str(item.get("flujo_neto", "")),
+                )
+                for item in flujo
+            ])
     
     def _add_page_21_indicadores_decision(self, content: dict):
         """Add Page 21 - Indicadores y Decisión"""
@@ -1473,37 +1779,13 @@ class MGASubsidiosBuilder:
         
         eval_eco = content.get("evaluacion_economica", {})
         
-        # Complex header table
-        table = self.doc.add_table(rows=3, cols=6)
-        table.style = 'Table Grid'
-        
-        # Header row 1
-        table.rows[0].cells[0].text = "Indicadores de rentabilidad"
-        self._set_cell_shading(table.rows[0].cells[0], "0099CC")
-        table.rows[0].cells[3].text = "Indicadores de costo-eficiencia"
-        self._set_cell_shading(table.rows[0].cells[3], "0099CC")
-        table.rows[0].cells[4].text = "Indicadores de costo mínimo"
-        self._set_cell_shading(table.rows[0].cells[4], "0099CC")
-        
-        # Header row 2
-        headers2 = ["Valor Presente Neto (VPN)", "Tasa Interna de Retorno (TIR)", 
-                   "Relación Costo Beneficio (RCB)", "Costo por beneficiario",
-                   "Valor presente de los costos", "Costo Anual Equivalente (CAE)"]
-        for i, h in enumerate(headers2):
-            table.rows[1].cells[i].text = h
-            self._set_cell_shading(table.rows[1].cells[i], "7FC8D8")
-            for run in table.rows[1].cells[i].paragraphs[0].runs:
-                run.font.size = Pt(8)
-        
-        # Values row
-        table.rows[2].cells[0].text = eval_eco.get("vpn", "")
-        table.rows[2].cells[1].text = eval_eco.get("tir", "")
-        table.rows[2].cells[2].text = eval_eco.get("rcb", "")
-        table.rows[2].cells[3].text = eval_eco.get("costo_beneficiario", "")
-        table.rows[2].cells[4].text = eval_eco.get("valor_presente_costos", "")
-        table.rows[2].cells[5].text = eval_eco.get("cae", "")
-        
-        self.doc.add_paragraph()
+        # Complex header table, cloned from the pre-parsed template
+        self._append_grid_template(EVALUACION_ECONOMICA_TBL, [
+            eval_eco.get(key, "")
+            for key in ("vpn", "tir", "rcb", "costo_beneficiario", "valor_presente_costos", "cae")
+        ])
+        
+        self._add_spacer()
         
         # Costo por capacidad
         self._add_subsection_title("Costo por capacidad")
@@ -1513,36 +1795,25 @@ class MGASubsidiosBuilder:
         
         # Create table with header + rows for each product
         num_rows = max(2, len(productos) + 1)  # At least 2 rows (header + 1 data)
-        table2 = self.doc.add_table(rows=1, cols=2)
-        table2.style = 'Table Grid'
-        table2.rows[0].cells[0].text = "Producto"
-        table2.rows[0].cells[1].text = "Costo unitario (valor presente)"
-        for cell in table2.rows[0].cells:
-            self._set_cell_shading(cell, "0099CC")
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
+        table2 = self._add_grid_table(rows=1, cols=2)
+        self._style_header_row(table2.rows[0], ["Producto", "Costo unitario (valor presente)"])
         
         # Add product rows
         if productos:
-            for prod in productos:
-                row = table2.add_row()
-                row.cells[0].text = prod.get("nombre", "")
-                row.cells[1].text = prod.get("costo", "")
+            rows = [(prod.get("nombre", ""), prod.get("costo", "")) for prod in productos]
         else:
             # Fallback to old single product format
-            row = table2.add_row()
-            row.cells[0].text = costo_cap.get("producto", "")
-            row.cells[1].text = costo_cap.get("costo_unitario", "")
+            rows = [(costo_cap.get("producto", ""), costo_cap.get("costo_unitario", ""))]
+        self._append_rows_bulk(table2, rows)
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Decisión
         self._add_subsection_title("03 - Decisión")
         
-        decision = content.get("decision", {})
-        self._add_field("Alternativa", decision.get("alternativa", ""))
+        self._add_field("Alternativa", _dig(content, DECISION_ALTERNATIVA))
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # Alcance
         self._add_subsection_title("04 - Alcance")
@@ -1555,17 +1826,17 @@ class MGASubsidiosBuilder:
         # Page 17 - Riesgos Continuation
         self._add_page_17_riesgos_continuacion(content.get("pagina_17_riesgos_continuacion", {}))
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Pages 18-19 - Ingresos y Beneficios
         self._add_page_18_19_ingresos_beneficios(content.get("pagina_18_19_ingresos_beneficios", {}))
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Page 20 - Flujo Económico
         self._add_page_20_flujo_economico(content.get("pagina_20_flujo_economico", {}))
         
-        self.doc.add_page_break()
+        self._add_page_break()
         
         # Page 21 - Indicadores y Decisión
         self._add_page_21_indicadores_decision(content.get("pagina_21_indicadores_decision", {}))
@@ -1596,7 +1867,7 @@ class MGASubsidiosBuilder:
             # We will add a break if it's not the last one, OR if we want to ensure separation.
             # Given MGA structure, usually each new page starts fresh.
             if idx < len(indicadores) - 1:
-                self.doc.add_page_break()
+                self._add_page_break()
 
     def _add_page_indicador(self, data: dict):
         """Render a single 'Indicadores de producto' page matching the client template"""
@@ -1605,14 +1876,14 @@ class MGASubsidiosBuilder:
         self._add_header("Programación", "Indicadores de producto")
         
         # Spacing
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # 1. Producto Section
         # Title "Producto" in Green
         p = self.doc.add_paragraph()
         run = p.add_run("Producto")
-        run.font.size = Pt(11)
-        run.font.color.rgb = RGBColor(112, 173, 71) # Client Green
+        run.font.size = SIZE_11PT
+        run.font.color.rgb = CLIENT_GREEN
         run.bold = True
         
         # Gray Box for Product Name
@@ -1625,19 +1896,19 @@ class MGASubsidiosBuilder:
         self._set_cell_shading(cell_prod, "F2F2F2") # Light Gray
         
         p_prod_val = cell_prod.paragraphs[0]
-        p_prod_val.paragraph_format.space_before = Pt(2)
-        p_prod_val.paragraph_format.space_after = Pt(2)
+        p_prod_val.paragraph_format.space_before = TIGHT_SPACING
+        p_prod_val.paragraph_format.space_after = TIGHT_SPACING
         run_prod_val = p_prod_val.add_run(prod_text)
-        run_prod_val.font.size = Pt(10)
+        run_prod_val.font.size = SIZE_10PT
         
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # 2. Indicador Section
         # Title "Indicador" in Green
         p = self.doc.add_paragraph()
         run = p.add_run("Indicador")
-        run.font.size = Pt(11)
-        run.font.color.rgb = RGBColor(112, 173, 71) # Client Green
+        run.font.size = SIZE_11PT
+        run.font.color.rgb = CLIENT_GREEN
         run.bold = True
         
         # Gray Box for Indicator Details
@@ -1665,23 +1936,23 @@ class MGASubsidiosBuilder:
                 label, val = text.split(":", 1)
                 run_l = p.add_run(label + ":")
                 run_l.bold = True
-                run_l.font.size = Pt(10)
+                run_l.font.size = SIZE_10PT
                 run_v = p.add_run(val)
-                run_v.font.size = Pt(10)
+                run_v.font.size = SIZE_10PT
             else:
                 run = p.add_run(text)
-                run.font.size = Pt(10)
+                run.font.size = SIZE_10PT
             
             # Add newline (except last)
             p.add_run("\n")
             
-        self.doc.add_paragraph()
+        self._add_spacer()
         
         # 3. Programación de indicadores Section
         p = self.doc.add_paragraph()
         run = p.add_run("Programación de indicadores")
-        run.font.size = Pt(11)
-        run.font.color.rgb = RGBColor(112, 173, 71) # Client Green
+        run.font.size = SIZE_11PT
+        run.font.color.rgb = CLIENT_GREEN
         run.bold = True
         
         programacion = data.get("programacion_indicadores", [])
@@ -1694,19 +1965,11 @@ class MGASubsidiosBuilder:
         # | Periodo | Meta por periodo | Periodo | Meta por periodo |
         # So it's a 4-column table filling the width.
         
-        table_prog = self.doc.add_table(rows=1, cols=4)
-        table_prog.style = 'Table Grid'
+        table_prog = self._add_grid_table(rows=1, cols=4)
         
         # Headers: Periodo | Meta | Periodo | Meta
         headers = ["Periodo", "Meta por periodo", "Periodo", "Meta por periodo"]
-        for i, h in enumerate(headers):
-            cell = table_prog.rows[0].cells[i]
-            cell.text = h
-            self._set_cell_shading(cell, "0099CC") # Client Blue
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-                run.font.bold = True
-                run.font.size = Pt(9)
+        self._style_header_row(table_prog.rows[0], headers, font_size=9, bold=True)
                 
         # Data Rows
         # Valid data items
@@ -1723,8 +1986,7 @@ class MGASubsidiosBuilder:
             idx1 = r * 2
             if idx1 < len(items):
                 item = items[idx1]
-                row.cells[0].text = str(item.get("periodo", ""))
-                row.cells[1].text = str(item.get("meta", ""))
+                self._set_row_text(row, [str(item.get("periodo", "")), str(item.get("meta", ""))])
                 self._set_cell_shading(row.cells[0], "E8F4F8") # Light Blue for period? image shows blue header, light blue data
                 self._set_cell_shading(row.cells[1], "E8F4F8")
             
@@ -1732,8 +1994,7 @@ class MGASubsidiosBuilder:
             idx2 = (r * 2) + 1
             if idx2 < len(items):
                 item = items[idx2]
-                row.cells[2].text = str(item.get("periodo", ""))
-                row.cells[3].text = str(item.get("meta", ""))
+                self._set_row_text(row, [None, None, str(item.get("periodo", "")), str(item.get("meta", ""))])
                 # Shade second pair too? Image isn't fully clear on alt rows vs blocks. 
                 # Let's keep it clean or same shading.
 
@@ -1750,8 +2011,8 @@ class MGASubsidiosBuilder:
         for idx, prod_data in enumerate(reg_productos):
             # Container paragraph for spacing
             p = self.doc.add_paragraph()
-            p.paragraph_format.space_before = Pt(12)
-            p.paragraph_format.space_after = Pt(0)
+            p.paragraph_format.space_before = SIZE_12PT
+            p.paragraph_format.space_after = NO_SPACING
 
             # Create ONE single table for the entire block to ensure alignment
             # Structure:
@@ -1770,70 +2031,55 @@ class MGASubsidiosBuilder:
             cell = t1.rows[0].cells[0]
             self._set_cell_shading(cell, "E0E0E0") # Light Gray
             p = cell.paragraphs[0]
-            p.paragraph_format.space_before = Pt(2)
-            p.paragraph_format.space_after = Pt(2)
+            p.paragraph_format.space_before = TIGHT_SPACING
+            p.paragraph_format.space_after = TIGHT_SPACING
             p.add_run("Producto: ").bold = True
             p.add_run(prod_data.get("producto", ""))
             
             # --- Table 2: Location (5 cols) ---
             # To visually merge, we rely on 0 spacing.
-            t2 = self.doc.add_table(rows=2, cols=5)
-            t2.style = 'Table Grid'
+            t2 = self._add_grid_table(rows=2, cols=5)
             
             headers_loc = ["Región", "Departamento", "Municipio", "Tipo de Agrupación", "Agrupación"]
-            for i, h in enumerate(headers_loc):
-                cell = t2.rows[0].cells[i]
-                cell.text = h
-                self._set_cell_shading(cell, "0099CC") # Client Blue
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255,255,255)
-                    run.font.bold = True
-                    run.font.size = Pt(9)
+            self._style_header_row(t2.rows[0], headers_loc, font_size=9, bold=True)
 
             ubicacion = prod_data.get("ubicacion", {})
-            t2.rows[1].cells[0].text = ubicacion.get("region", "Caribe")
-            t2.rows[1].cells[1].text = ubicacion.get("departamento", "")
-            t2.rows[1].cells[2].text = ubicacion.get("municipio", "")
-            t2.rows[1].cells[3].text = ubicacion.get("tipo_agrupacion", "")
-            t2.rows[1].cells[4].text = ubicacion.get("agrupacion", "")
+            self._set_row_text(t2.rows[1], [
+                ubicacion.get("region", "Caribe"),
+                ubicacion.get("departamento", ""),
+                ubicacion.get("municipio", ""),
+                ubicacion.get("tipo_agrupacion", ""),
+                ubicacion.get("agrupacion", ""),
+            ])
             
             for cell in t2.rows[1].cells:
                 for p in cell.paragraphs:
                     for run in p.runs:
-                        run.font.size = Pt(9)
+                        run.font.size = SIZE_9PT
 
             # --- Table 3: Costs (6 cols) ---
             tabla_costos = prod_data.get("tabla_costos", [])
             if not tabla_costos:
                 tabla_costos = [{"periodo": "0", "costo_total": "0"}]
                 
-            t3 = self.doc.add_table(rows=1 + len(tabla_costos), cols=6)
-            t3.style = 'Table Grid'
+            t3 = self._add_grid_table(rows=1 + len(tabla_costos), cols=6)
             
             headers_cost = ["Periodo", "Costo Total", "Costo\nRegionalizado", "Meta Total", "Meta\nRegionalizada", "Beneficiarios"]
-            for i, h in enumerate(headers_cost):
-                cell = t3.rows[0].cells[i]
-                cell.text = h
-                self._set_cell_shading(cell, "8DB4E2") # Periwinkle Blue
-                for run in cell.paragraphs[0].runs:
-                    run.font.color.rgb = RGBColor(255,255,255)
-                    run.font.bold = True
-                    run.font.size = Pt(9)
+            self._style_header_row(t3.rows[0], headers_cost, fill="8DB4E2", font_size=9, bold=True)
             
             for r_idx, item in enumerate(tabla_costos):
                 row = t3.rows[r_idx + 1]
-                row.cells[0].text = str(item.get("periodo", ""))
-                row.cells[1].text = str(item.get("costo_total", ""))
-                row.cells[2].text = str(item.get("costo_regionalizado", ""))
-                row.cells[3].text = str(item.get("meta_total", ""))
-                row.cells[4].text = str(item.get("meta_regionalizada", ""))
-                row.cells[5].text = str(item.get("beneficiarios", ""))
+                self._set_row_text(row, [
+                    str(item.get(key, ""))
+                    for key in ("periodo", "costo_total", "costo_regionalizado",
+                                "meta_total", "meta_regionalizada", "beneficiarios")
+                ])
                 
                 for cell in row.cells:
                     cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.RIGHT
                     for p in cell.paragraphs:
                         for run in p.runs:
-                            run.font.size = Pt(9)
+                            run.font.size = SIZE_9PT
             
             # Post-processing to "merge" them visually:
             # 1. Ensure columns widths are aligned roughly (Total width ~7 inches)
@@ -1884,11 +2130,7 @@ class MGASubsidiosBuilder:
                 
                 # Items
                 for item in items:
-                    try:
-                        val = float(str(item.get("valor", "0")).replace(".", "").replace(",", ".").replace("$", "").strip())
-                    except:
-                        val = 0.0
-                    cat_total_val += val
+                    cat_total_val += _parse_cop(item.get("valor", "0"))
                     
                     rows_to_render.append({
                         "type": "item",
@@ -1905,7 +2147,7 @@ class MGASubsidiosBuilder:
                     "policy": policy,
                     "category": category, # Still part of this category block for merging
                     "subcategory": "Total Categoría",
-                    "value": f"${cat_total_val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                    "value": _format_cop(cat_total_val)
                 })
                 
             # Policy Total Row
@@ -1914,24 +2156,17 @@ class MGASubsidiosBuilder:
                 "policy": policy, # Still part of this policy block for merging
                 "category": "TOTAL POLITICA TRANSVERSAL",
                 "subcategory": "", 
-                "value": f"${policy_total_val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+                "value": _format_cop(policy_total_val)
             })
 
         # --- Table Rendering ---
-        table = self.doc.add_table(rows=1 + len(rows_to_render), cols=4)
-        table.style = 'Table Grid'
+        table = self._add_grid_table(rows=1 + len(rows_to_render), cols=4)
         
         # Headers
         headers = ["Política", "Categoría", "SubCategoría", "Valor"]
-        for i, h in enumerate(headers):
-            cell = table.rows[0].cells[i]
-            cell.text = h
-            self._set_cell_shading(cell, "0099CC") # Client Blue
+        self._style_header_row(table.rows[0], headers, font_size=10, bold=True)
+        for cell in table.rows[0].cells:
             self._set_cell_margins(cell, top=100, bottom=100) # Increased padding (approx 5pt)
-            for run in cell.paragraphs[0].runs:
-                run.font.color.rgb = RGBColor(255, 255, 255)
-                run.font.bold = True
-                run.font.size = Pt(10)
 
         # Render Rows
         LIGHT_BLUE_BG = "E8F4F8" # Very light blue match
@@ -1942,24 +2177,18 @@ class MGASubsidiosBuilder:
             # Content
             # P/C handling is done via merging later, but set text for reference or first items
             if row_data["type"] == "total_pol":
-                table_row.cells[1].text = row_data["category"] # "TOTAL POLITICA..."
-                table_row.cells[3].text = row_data["value"]
+                self._set_row_text(table_row, [None, row_data["category"], None, row_data["value"]]) # "TOTAL POLITICA..."
                 # Col 1 is merged (policy)
                 # Col 2 spans Col 2-3? Or just text in Col 2. Reference shows "TOTAL..." in Cat column.
                 
             elif row_data["type"] == "total_cat":
-                table_row.cells[2].text = row_data["subcategory"] # "Total Categoría" uses SubCat column visually?
-                # Actually screenshot shows "Total Categoría" in the THIRD column (SubCategoría)? 
-                # Wait, "Total Categoría" text is aligned right next to value? 
                 # Screenshot 2: "Total Categoría" is in SubCategoría column.
-                table_row.cells[2].text = "Total Categoría"
-                table_row.cells[3].text = row_data["value"]
+                self._set_row_text(table_row, [None, None, "Total Categoría", row_data["value"]])
                 
             else: # Item
-                table_row.cells[0].text = row_data["policy"]
-                table_row.cells[1].text = row_data["category"]
-                table_row.cells[2].text = row_data["subcategory"]
-                table_row.cells[3].text = str(row_data["value"])
+                self._set_row_text(table_row, [
+                    row_data["policy"], row_data["category"], row_data["subcategory"], str(row_data["value"])
+                ])
             
             # Styling (All rows light blue)
             for cell in table_row.cells:
@@ -1967,7 +2196,7 @@ class MGASubsidiosBuilder:
                 self._set_cell_margins(cell, top=100, bottom=100) # Airy look
                 for p in cell.paragraphs:
                     for run in p.runs:
-                        run.font.size = Pt(9)
+                        run.font.size = SIZE_9PT
             
             # Formatting specifics
             if row_data["type"] == "total_cat":
@@ -2027,59 +2256,54 @@ class MGASubsidiosBuilder:
             return
             
         cell_start = table.rows[start_row_idx].cells[col_idx]
-        tc_start = cell_start._tc
-        tcPr_start = tc_start.get_or_add_tcPr()
-        vMerge_start = OxmlElement('w:vMerge')
-        vMerge_start.set(qn('w:val'), 'restart')
-        tcPr_start.append(vMerge_start)
+        cell_start._tc.get_or_add_tcPr().append(deepcopy(VMERGE_RESTART))
         
         for i in range(start_row_idx + 1, end_row_idx):
             cell = table.rows[i].cells[col_idx]
-            tc = cell._tc
-            tcPr = tc.get_or_add_tcPr()
-            vMerge = OxmlElement('w:vMerge')
-            # attribute val defaults to 'continue' if omitted, but explicit is safer
-            tcPr.append(vMerge)
+            # vMerge without a val means 'continue'
+            cell._tc.get_or_add_tcPr().append(deepcopy(VMERGE_CONTINUE))
             
             # Clear text in merged cells to avoid duplication display issues in some viewers
             cell.text = ""
 
     def _set_cell_margins(self, cell, top=0, bottom=0, start=0, end=0):
         """Set cell margins (padding) in Twips (1/20 pt)"""
-        tc = cell._tc
-        tcPr = tc.get_or_add_tcPr()
-        tcMar = OxmlElement('w:tcMar')
-        
-        if top > 0:
-            node = OxmlElement('w:top')
-            node.set(qn('w:w'), str(top))
-            node.set(qn('w:type'), 'dxa')
-            tcMar.append(node)
-        if bottom > 0:
-            node = OxmlElement('w:bottom')
-            node.set(qn('w:w'), str(bottom))
-            node.set(qn('w:type'), 'dxa')
-            tcMar.append(node)
-            
-        # Add to properties (replace existing if any? simplified append here)
+        tcPr = cell._tc.get_or_add_tcPr()
         existing = tcPr.find(qn('w:tcMar'))
         if existing is not None:
             tcPr.remove(existing)
-        tcPr.append(tcMar)
+        tcPr.append(deepcopy(_cell_margins(top, bottom)))
 
     def _set_cell_shading(self, cell, color):
         """Set cell background color"""
-        tc = cell._tc
-        tcPr = tc.get_or_add_tcPr()
-        shading = OxmlElement('w:shd')
-        shading.set(qn('w:fill'), color)
-        tcPr.append(shading)
+        cell._tc.get_or_add_tcPr().append(deepcopy(_shading(color)))
+    
+    def _set_row_text(self, row, values):
+        """Write one value per cell of a table row (None skips the cell) without building _Cell proxies"""
+        for tc, value in zip(row._tr.tc_lst, values):
+            if value is not None:
+                _set_tc_text(tc, value)
+    
+    def _style_header_row(self, row, headers, fill: str = "0099CC", font_size: int = None,
+                          bold: bool = False):
+        """Write a table's header row in one pass: text, cell fill and white (optionally sized/bold) runs"""
+        rpr = _header_rpr(font_size, bold)
+        for tc, header in zip(row._tr.tc_lst, headers):
+            _set_tc_text(tc, header)
+            tc.get_or_add_tcPr().append(deepcopy(_shading(fill)))
+            for r in tc.iter(qn('w:r')):
+                r.insert(0, deepcopy(rpr))
+    
+    def _set_white_text(self, cell):
+        """Color every run in a cell white (header text over a dark fill)"""
+        for r in cell._tc.iter(qn('w:r')):
+            if r.rPr is None:
+                r.insert(0, deepcopy(WHITE_RPR))
+            else:
+                r.rPr.get_or_add_color().set(qn('w:val'), "FFFFFF")
     
     def _save_document(self, data):
-        """Save the document to file as PDF"""
-        from docx2pdf import convert
-        import platform
-        
+        """Save the document as DOCX and, unless output_format is "docx", convert it to PDF"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # Handle case where data is not a dict
@@ -2089,7 +2313,7 @@ class MGASubsidiosBuilder:
             municipio = "documento"
         
         # Remove invalid filename characters
-        municipio = re.sub(r'[^a-zA-Z0-9_\-]', '', municipio.replace(" ", "_"))
+        municipio = FILENAME_UNSAFE_RE.sub('', municipio.replace(" ", "_"))
         if not municipio:
             municipio = "documento"
         
@@ -2098,24 +2322,26 @@ class MGASubsidiosBuilder:
         docx_filepath = os.path.join(self.output_dir, docx_filename)
         self.doc.save(docx_filepath)
         
+        # docx2pdf needs Microsoft Word; elsewhere the DOCX is the deliverable
+        if self.output_format == "docx" or HOST_SYSTEM not in PDF_PLATFORMS:
+            return docx_filepath
+        
         # Convert to PDF
         pdf_filename = f"MGA_{municipio}_{timestamp}.pdf"
         pdf_filepath = os.path.join(self.output_dir, pdf_filename)
         
         try:
-            # Initialize COM for Windows (required for docx2pdf in threaded environments)
-            if platform.system() == 'Windows':
-                import pythoncom
-                pythoncom.CoInitialize()
-            
-            convert(docx_filepath, pdf_filepath)
-            
-            # Uninitialize COM
-            if platform.system() == 'Windows':
-                pythoncom.CoUninitialize()
+            if HOST_SYSTEM == 'Windows':
+                # Reuse the worker's Word instance instead of launching Word per document
+                _convert_with_word(docx_filepath, pdf_filepath)
+            else:
+                if docx2pdf_convert is None:
+                    raise ImportError("docx2pdf is not installed")
+                docx2pdf_convert(docx_filepath, pdf_filepath)
             
             # Remove temporary DOCX file
-            os.remove(docx_filepath)
+            if self.output_format == "pdf":
+                os.remove(docx_filepath)
             return pdf_filepath
         except Exception as e:
             # If PDF conversion fails, return DOCX
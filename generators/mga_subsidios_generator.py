@@ -8,14 +8,19 @@ import sys
 import json
 import re
 import time
+import threading
+import concurrent.futures
 from datetime import datetime
+from functools import lru_cache
 sys.path.append('..')
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from config import invoke_llm
 from prompts.mga_subsidios_structured import (
     MGA_SUBSIDIOS_SYSTEM,
+    PROMPT_MGA_SUBSIDIOS_DATOS,
     PROMPT_MGA_SUBSIDIOS_PAGINAS_1_5,
     PROMPT_MGA_SUBSIDIOS_PAGINAS_6_11,
     PROMPT_MGA_SUBSIDIOS_PAGINAS_12_16,
@@ -24,6 +29,61 @@ from prompts.mga_subsidios_structured import (
 )
 from generators.mga_subsidios_builder import MGASubsidiosBuilder
 
+# orjson parses the (multi-KB) page-group responses faster when installed; its
+# JSONDecodeError subclasses json.JSONDecodeError, so the handlers are shared
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+
+# LLM prompt per page group, in document order
+PAGE_GROUP_PROMPTS = (
+    ("1-5", PROMPT_MGA_SUBSIDIOS_PAGINAS_1_5),
+    ("6-11", PROMPT_MGA_SUBSIDIOS_PAGINAS_6_11),
+    ("12-16", PROMPT_MGA_SUBSIDIOS_PAGINAS_12_16),
+    ("17-21", PROMPT_MGA_SUBSIDIOS_PAGINAS_17_21),
+    ("22-24", PROMPT_MGA_SUBSIDIOS_PAGINAS_22_24),
+)
+
+# Delay between starting consecutive page-group LLM calls (rate limit)
+PAGE_GROUP_STAGGER_SECONDS = 3
+
+# Anthropic only caches prompt prefixes that are explicitly marked; the other
+# providers cache repeated prefixes automatically
+ANTHROPIC_LLM_TYPE = "anthropic-chat"
+EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+@lru_cache(maxsize=None)
+def _page_group_prompt(prompt_template: str, system_template: str, cache_marked: bool) -> ChatPromptTemplate:
+    """
+    Chat prompt for one page group, parsed once per process. Every page group
+    starts with the same system prompt and project data, so only the
+    page-specific instructions differ between the requests.
+    """
+    if cache_marked:
+        system = [{"type": "text", "text": system_template, "cache_control": EPHEMERAL_CACHE}]
+        human = [
+            {"type": "text", "text": PROMPT_MGA_SUBSIDIOS_DATOS, "cache_control": EPHEMERAL_CACHE},
+            {"type": "text", "text": prompt_template},
+        ]
+    else:
+        system = system_template
+        human = PROMPT_MGA_SUBSIDIOS_DATOS + prompt_template
+    return ChatPromptTemplate.from_messages([
+        ("system", system),
+        ("human", human)
+    ])
+
+
+def _flag_failure(failed: threading.Event):
+    """Future callback that sets `failed` when the call raised"""
+    def callback(future: concurrent.futures.Future):
+        if not future.cancelled() and future.exception() is not None:
+            failed.set()
+    return callback
+
 
 class MGASubsidiosGenerator:
     """Generator for MGA Subsidios documents (24 pages)"""
@@ -35,16 +95,14 @@ class MGASubsidiosGenerator:
     
     def _create_chain(self, prompt_template: str, system_template: str = MGA_SUBSIDIOS_SYSTEM):
         """Create a LangChain chain for a specific prompt"""
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_template),
-            ("human", prompt_template)
-        ])
+        cache_marked = getattr(self.llm, "_llm_type", "") == ANTHROPIC_LLM_TYPE
+        prompt = _page_group_prompt(prompt_template, system_template, cache_marked)
         return prompt | self.llm | self.output_parser
     
     def _extract_json(self, response: str) -> dict:
         """Extract JSON from AI response"""
         try:
-            return json.loads(response)
+            return json_loads(response)
         except json.JSONDecodeError:
             pass
         
@@ -59,7 +117,7 @@ class MGASubsidiosGenerator:
             if match:
                 try:
                     json_str = match.group(1) if '```' in pattern else match.group(0)
-                    return json.loads(json_str)
+                    return json_loads(json_str)
                 except (json.JSONDecodeError, IndexError):
                     continue
         
@@ -95,41 +153,34 @@ class MGASubsidiosGenerator:
             "context_dump": (data.get("context_dump", "No disponible") or "")[:3000]  # Truncate to avoid token limit
         }
         
-        # Generate pages 1-5
-        chain_1_5 = self._create_chain(PROMPT_MGA_SUBSIDIOS_PAGINAS_1_5)
-        response_1_5 = chain_1_5.invoke(invoke_data)
-        ai_content_1_5 = self._extract_json(response_1_5)
-        print("MGA Page 1-5 done. Waiting 3s...")
-        time.sleep(3) # Wait to avoid Rate Limit
-        
-        # Generate pages 6-11
-        chain_6_11 = self._create_chain(PROMPT_MGA_SUBSIDIOS_PAGINAS_6_11)
-        response_6_11 = chain_6_11.invoke(invoke_data)
-        ai_content_6_11 = self._extract_json(response_6_11)
-        print("MGA Page 6-11 done. Waiting 3s...")
-        time.sleep(3) # Wait
-        
-        # Generate pages 12-16
-        chain_12_16 = self._create_chain(PROMPT_MGA_SUBSIDIOS_PAGINAS_12_16)
-        response_12_16 = chain_12_16.invoke(invoke_data)
-        ai_content_12_16 = self._extract_json(response_12_16)
-        print("MGA Page 12-16 done. Waiting 3s...")
-        time.sleep(3) # Wait
-        
-        # Generate pages 17-21
-        chain_17_21 = self._create_chain(PROMPT_MGA_SUBSIDIOS_PAGINAS_17_21)
-        response_17_21 = chain_17_21.invoke(invoke_data)
-        ai_content_17_21 = self._extract_json(response_17_21)
-        print("MGA Page 17-21 done. Waiting 3s...")
-        time.sleep(3) # Wait
-        
-        # Generate pages 22-24
-        chain_22_24 = self._create_chain(PROMPT_MGA_SUBSIDIOS_PAGINAS_22_24)
-        response_22_24 = chain_22_24.invoke(invoke_data)
-        ai_content_22_24 = self._extract_json(response_22_24)
-        
-        # Merge all content
-        ai_content = {**ai_content_1_5, **ai_content_6_11, **ai_content_12_16, **ai_content_17_21, **ai_content_22_24}
+        # Request each page group from the LLM. Calls are still started 3s apart to
+        # stay under the rate limit, but each one no longer waits for the previous
+        # response; the groups are independent and are merged in page order.
+        # One failed group fails the document, so after a failure no further
+        # groups are started and those still waiting for a request slot are dropped.
+        failed = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(PAGE_GROUP_PROMPTS)) as executor:
+            futures = []
+            for i, (pages, prompt) in enumerate(PAGE_GROUP_PROMPTS):
+                if i and failed.wait(PAGE_GROUP_STAGGER_SECONDS):
+                    break
+                future = executor.submit(invoke_llm, self._create_chain(prompt), invoke_data, failed)
+                future.add_done_callback(_flag_failure(failed))
+                futures.append((pages, future))
+            
+            responses = []
+            ai_content = {}
+            try:
+                for pages, future in futures:
+                    response = future.result()
+                    responses.append(response)
+                    ai_content.update(self._extract_json(response))
+                    print(f"MGA Page {pages} done.")
+            except BaseException:
+                failed.set()
+                for _, future in futures:
+                    future.cancel()
+                raise
         
         # Build the Word document
         letterhead_file = data.get("letterhead_file")
@@ -137,7 +188,7 @@ class MGASubsidiosGenerator:
         
         return {
             "filepath": filepath,
-            "documento_completo": response_1_5 + "\n\n" + response_6_11 + "\n\n" + response_12_16 + "\n\n" + response_17_21 + "\n\n" + response_22_24,
+            "documento_completo": "\n\n".join(responses),
             "ai_content": ai_content,
             "metadata": {
                 "tipo": "mga_subsidios",
@@ -3,11 +3,18 @@ Unified MGA Document Generator
 Orchestrates the generation of all supporting documents in parallel.
 """
 
+import io
 import os
+import re
+import json
+import tempfile
+import time
+import statistics
 import zipfile
 import concurrent.futures
 from datetime import datetime
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Dict, List, Any, BinaryIO, Iterator
 
 # Import individual generators
 from generators.estudios_previos_generator import EstudiosPreviosGenerator
@@ -15,7 +22,82 @@ from generators.analisis_sector_generator import AnalisisSectorGenerator
 from generators.dts_generator import DTSGenerator
 from generators.certificaciones_generator import CertificacionesGenerator
 from generators.mga_subsidios_generator import MGASubsidiosGenerator
-from config import get_llm
+from langchain_core.caches import InMemoryCache
+from config import get_llm, LATENCY_PATH
+
+
+# Documents in the bundle, in the order their results are reported
+GENERATORS = (
+    ("estudios_previos", EstudiosPreviosGenerator),
+    ("analisis_sector", AnalisisSectorGenerator),
+    ("dts", DTSGenerator),
+    ("certificaciones", CertificacionesGenerator),
+    ("mga_subsidios", MGASubsidiosGenerator),
+)
+
+# Outermost JSON object in a response (the generators' last-resort parse)
+JSON_OBJECT_RE = re.compile(r'\{[\s\S]*\}')
+
+
+def _has_json_content(text: str) -> bool:
+    """Whether a response holds a non-empty JSON object the generators can use"""
+    match = JSON_OBJECT_RE.search(text)
+    if not match:
+        return False
+    try:
+        content = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return False
+    return isinstance(content, dict) and bool(content)
+
+
+class ParsedResponseCache(InMemoryCache):
+    """
+    In-memory LLM cache that only keeps responses with usable JSON, so a
+    truncated or malformed answer is requested again on the next run
+    instead of being replayed.
+    """
+    
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        if all(_has_json_content(generation.text) for generation in return_val):
+            super().update(prompt, llm_string, return_val)
+
+
+# LLM responses shared across generate_all runs, keyed by prompt and model
+# parameters: regenerating the same project reuses the answers instead of
+# paying for the identical prompts again
+LLM_CACHE_SIZE = 64
+LLM_RESPONSE_CACHE = ParsedResponseCache(maxsize=LLM_CACHE_SIZE)
+
+# Deflate level for the bundle ZIP. DOCX/PDF members are already compressed, so
+# a low level gets nearly all of the (small) saving at a fraction of the CPU
+ZIP_COMPRESSLEVEL = 3
+
+# Generators run at once (1 restores fully sequential generation). Their LLM
+# requests also share config.LLM_MAX_CONCURRENT_REQUESTS, so more workers only
+# overlap the local document building
+GENERATOR_WORKERS = 2
+
+# Delay between starting consecutive generators, so their first LLM calls
+# do not hit the API at the same moment (rate limits / 429)
+GENERATOR_STAGGER_SECONDS = 3
+
+# Characters dropped from the project name when naming the bundle ZIP
+# (keeps letters, digits, spaces, '-' and '_')
+ZIP_NAME_UNSAFE_RE = re.compile(r'[^\w \-]+')
+
+# Per-document generation times (seconds) from recent runs, kept at LATENCY_PATH
+# so the slowest generators can be started first; the defaults cover the
+# first run
+LATENCY_HISTORY = 10
+DEFAULT_LATENCY = {
+    "mga_subsidios": 120.0,
+    "dts": 60.0,
+    "analisis_sector": 60.0,
+    "estudios_previos": 45.0,
+    "certificaciones": 20.0,
+}
+
 
 class UnifiedGenerator:
     """
@@ -24,8 +106,7 @@ class UnifiedGenerator:
     
     def __init__(self, output_dir: str = "output"):
         self.output_dir = output_dir
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
 
     def generate_all(self, data: Dict[str, Any], model_name: str = "groq") -> Dict[str, Any]:
         """
@@ -38,96 +119,166 @@ class UnifiedGenerator:
         Returns:
             Dictionary with results...
         """
+        for item in self.generate_all_stream(data, model_name):
+            pass
+        return item
+
+    def generate_all_stream(self, data: Dict[str, Any], model_name: str = "groq") -> Iterator[Dict[str, Any]]:
+        """
+        Generate all documents in parallel, yielding each document's result
+        ({"type", "status", "file"/"error"}) as soon as its generator finishes.
+        The last item is the summary dictionary returned by generate_all.
+        """
         # Initialize LLM
         try:
-            llm = get_llm(model_name)
+            llm = self._shared_llm(model_name)
         except Exception as e:
-            return {"success": False, "results": [], "error": f"LLM init failed: {e}"}
+            yield {"success": False, "results": [], "error": f"LLM init failed: {e}"}
+            return
             
         # Initialize generators with LLM
-        generators = {
-            "estudios_previos": EstudiosPreviosGenerator(llm),
-            "analisis_sector": AnalisisSectorGenerator(llm),
-            "dts": DTSGenerator(llm),
-            "certificaciones": CertificacionesGenerator(llm),
-            "mga_subsidios": MGASubsidiosGenerator(llm)
-        }
-
-        results = []
-        files_to_zip = []
-        
-        # Define tasks
         tasks = {
-            "estudios_previos": generators["estudios_previos"].generate_complete,
-            "analisis_sector": generators["analisis_sector"].generate_complete,
-            "dts": generators["dts"].generate_complete,
-            "certificaciones": generators["certificaciones"].generate_complete,
-            "mga_subsidios": generators["mga_subsidios"].generate_complete
+            doc_type: generator_class(llm).generate_complete
+            for doc_type, generator_class in GENERATORS
         }
         
-        # Execute sequentially to avoid Rate Limits (429)
-        import time
-        
-        for doc_type, func in tasks.items():
-            try:
+        # Start the slowest generators first so the long ones are not left
+        # running alone at the end while the quick ones have already finished
+        history = self._load_latency()
+        predicted = {
+            doc_type: self._predicted_latency(history, doc_type) for doc_type in tasks
+        }
+        order = sorted(tasks, key=predicted.get, reverse=True)
+
+        outcomes = {}
+        files_to_zip = []
+        # The bundle is a handful of documents, so it is assembled in memory
+        # and written once; callers get the bytes without reading it back
+        zip_buffer = io.BytesIO()
+
+        # Run the generators concurrently; they spend their time waiting on the LLM.
+        # Starts are staggered so requests still reach the API spaced out (429s).
+        with concurrent.futures.ThreadPoolExecutor(max_workers=GENERATOR_WORKERS) as executor:
+            futures = {}
+            for i, doc_type in enumerate(order):
+                if i:
+                    time.sleep(GENERATOR_STAGGER_SECONDS)
                 print(f"Generating {doc_type}...")
-                result = func(data)
-                
-                # Handle different return types
-                filepath = None
-                if isinstance(result, str):
-                    filepath = result
-                elif isinstance(result, dict) and "filepath" in result:
-                    filepath = result["filepath"]
-                
-                if filepath and os.path.exists(filepath):
-                    results.append({
-                        "type": doc_type,
-                        "status": "success",
-                        "file": filepath
-                    })
-                    files_to_zip.append(filepath)
-                else:
-                    results.append({
-                        "type": doc_type,
-                        "status": "error",
-                        "error": "File not created or invalid return type"
-                    })
-                
-                # Adaptive delay to respect Rate Limits (reduced for faster gen)
-                # MGA Subsidios is heavy, so we wait longer after it
-                wait_time = 5 if doc_type == "mga_subsidios" else 3
-                print(f"Waiting {wait_time}s to cool down API...")
-                time.sleep(wait_time)
-                    
-            except Exception as e:
-                results.append({
-                    "type": doc_type,
-                    "status": "error",
-                    "error": str(e)
-                })
-                print(f"Error generating {doc_type}: {e}")
-
-        # Create ZIP if we have files
-        zip_path = None
+                futures[executor.submit(self._timed, tasks[doc_type], data)] = doc_type
+            
+            # Each document goes into the ZIP as soon as it is ready, while the
+            # slower generators are still running
+            with self._open_zip(zip_buffer) as zipf:
+                for future in concurrent.futures.as_completed(futures):
+                    doc_type = futures[future]
+                    outcome = outcomes[doc_type] = self._collect_result(doc_type, future, history)
+                    if outcome["status"] == "success":
+                        zipf.write(outcome["file"], os.path.basename(outcome["file"]))
+                        files_to_zip.append(outcome["file"])
+                    yield outcome
+
+        self._save_latency(history)
+
+        zip_path = zip_data = None
         if files_to_zip:
-            zip_path = self._create_zip(files_to_zip, data.get("municipio", "proyecto"))
+            zip_data = zip_buffer.getvalue()
+            zip_path = self._zip_filepath(data.get("municipio", "proyecto"))
+            with open(zip_path, "wb") as f:
+                f.write(zip_data)
             
-        return {
+        yield {
             "success": len(files_to_zip) > 0,
-            "results": results,
-            "zip_file": zip_path
+            "results": [outcomes[doc_type] for doc_type in tasks],
+            "zip_file": zip_path,
+            "zip_data": zip_data
+        }
+
+    @staticmethod
+    def _collect_result(doc_type: str, future, history: Dict[str, List[float]]) -> Dict[str, Any]:
+        """Turn a finished generator future into its result entry."""
+        try:
+            result, elapsed = future.result()
+            # Every generate_complete returns a dict with the "filepath" its
+            # builder saved (builders raise if nothing was written)
+            filepath = result["filepath"]
+        except Exception as e:
+            print(f"Error generating {doc_type}: {e}")
+            return {
+                "type": doc_type,
+                "status": "error",
+                "error": str(e)
+            }
+        
+        runs = history.setdefault(doc_type, [])
+        runs.append(round(elapsed, 1))
+        del runs[:-LATENCY_HISTORY]
+        return {
+            "type": doc_type,
+            "status": "success",
+            "file": filepath
         }
     
-    def _create_zip(self, file_paths: List[str], project_name: str) -> str:
-        """Create a ZIP archive of the generated files."""
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _shared_llm(model_name: str):
+        """get_llm's client for model_name with the shared response cache attached."""
+        return get_llm(model_name).model_copy(update={"cache": LLM_RESPONSE_CACHE})
+
+    @staticmethod
+    def _timed(func, data):
+        """Run a generator, returning its result and how long it took."""
+        start = time.monotonic()
+        result = func(data)
+        return result, time.monotonic() - start
+
+    @staticmethod
+    def _predicted_latency(history: Dict[str, List[float]], doc_type: str) -> float:
+        """Median of the recent generation times, or the default estimate."""
+        runs = history.get(doc_type)
+        if runs:
+            return statistics.median(runs)
+        return DEFAULT_LATENCY.get(doc_type, 0.0)
+
+    @staticmethod
+    def _load_latency() -> Dict[str, List[float]]:
+        """Read the recorded generation times (empty if missing or unreadable)."""
+        try:
+            with open(LATENCY_PATH, encoding="utf-8") as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return history if isinstance(history, dict) else {}
+
+    @staticmethod
+    def _save_latency(history: Dict[str, List[float]]):
+        """Persist the generation times for the next run's ordering."""
+        # Written to a temporary file and swapped in, so concurrent runs never
+        # read a half-written file (the last run to finish wins)
+        tmp_path = None
+        try:
+            directory = os.path.dirname(LATENCY_PATH)
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                "w", encoding="utf-8", dir=directory, suffix=".tmp", delete=False
+            ) as f:
+                tmp_path = f.name
+                json.dump(history, f)
+            os.replace(tmp_path, LATENCY_PATH)
+        except OSError as e:
+            print(f"Could not save generation times: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _zip_filepath(self, project_name: str) -> str:
+        """Path of the bundle ZIP for a project."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_name = "".join(x for x in project_name if x.isalnum() or x in (' ', '-', '_')).strip()
+        safe_name = ZIP_NAME_UNSAFE_RE.sub('', project_name).strip()
         zip_filename = f"MGA_Documentos_{safe_name}_{timestamp}.zip"
-        zip_filepath = os.path.join(self.output_dir, zip_filename)
-        
-        with zipfile.ZipFile(zip_filepath, 'w') as zipf:
-            for file in file_paths:
-                zipf.write(file, os.path.basename(file))
-                
-        return zip_filepath
+        return os.path.join(self.output_dir, zip_filename)
+
+    @staticmethod
+    def _open_zip(out: BinaryIO) -> zipfile.ZipFile:
+        """Open a bundle ZIP for writing over a binary writer."""
+        return zipfile.ZipFile(
+            out, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL
+        )
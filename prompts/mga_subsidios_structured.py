@@ -3,10 +3,25 @@ MGA Document Structured Prompt Templates
 Full MGA document for investment projects (dynamic pages based on POAI + Development Plan)
 """
 
+import re
+
 from .base_prompts import MGA_CONTEXT
 
-MGA_SUBSIDIOS_SYSTEM = f"""
-{MGA_CONTEXT}
+
+# Page-group prompts end with an indented JSON skeleton after this marker. The
+# indentation is only for reading the source: it is dropped at import so the
+# model is not sent (and billed for) hundreds of tokens of spaces per request.
+JSON_SKELETON_MARKER = "RESPONDE CON JSON VÁLIDO:"
+SKELETON_INDENT_RE = re.compile(r"[ \t]*\n[ \t]*")
+
+
+def _compact_json_skeleton(prompt: str) -> str:
+    """Strip the line indentation of the JSON skeleton that closes a prompt"""
+    instructions, marker, skeleton = prompt.partition(JSON_SKELETON_MARKER)
+    return instructions + marker + SKELETON_INDENT_RE.sub("\n", skeleton)
+
+
+MGA_SUBSIDIOS_SYSTEM = MGA_CONTEXT + """
 
 Tu tarea es generar contenido estructurado para un documento MGA (Metodología General Ajustada) para proyectos de inversión pública.
 
@@ -44,16 +59,15 @@ El documento sigue el formato oficial del DNP. Las secciones se adaptan según e
    - Responde SOLO en JSON válido.
 """
 
-PROMPT_MGA_SUBSIDIOS_PAGINAS_1_5 = """
-Genera contenido para las PRIMERAS 5 PÁGINAS del documento MGA.
-
-**INSTRUCCIONES CLAVES - NO DEJES NADA VACÍO:**
-
-DATOS BÁSICOS PROPORCIONADOS:
+# Project data shared by every page group. It goes right after the system
+# prompt, so all the page-group requests of a document start with the same
+# text and provider prompt caching can reuse it.
+PROMPT_MGA_SUBSIDIOS_DATOS = """
+DATOS DEL PROYECTO:
 Municipio: {municipio} | Departamento: {departamento}
 Entidad: {entidad} | BPIN: {bpin}
 Proyecto: "{nombre_proyecto}"
-Valor: ${valor_total} COP | Duración: {duracion} días
+Valor Total: ${valor_total} COP | Duración: {duracion} días
 Responsable: {responsable} ({cargo})
 Identificador: {identificador}
 Fecha creación: {fecha_creacion}
@@ -63,10 +77,14 @@ Plan Nacional: {plan_nacional}
 Plan Departamental: {plan_departamental}
 Plan Municipal: {plan_municipal}
 
-CONTEXTO ADICIONAL:
+CONTEXTO POAI / PLAN DE DESARROLLO:
 {context_dump}
+"""
 
-**TU TAREA:**
+PROMPT_MGA_SUBSIDIOS_PAGINAS_1_5 = _compact_json_skeleton("""
+Genera contenido para las PRIMERAS 5 PÁGINAS del documento MGA.
+
+**TU TAREA (NO DEJES NADA VACÍO):**
 1. Completa TODOS los campos. Si el "Plan de Desarrollo" no especifica un programa exacto, ASIGNA uno que sea coherente con "{nombre_proyecto}".
 2. Para "Problema Central" y "Causas/Efectos": REDACTA el árbol de problemas basado en el nombre del proyecto.
 3. **IDENTIFICADOR**: Si el dato "Identificador" entregado está vacío, GENERA uno con formato "2026-xxxxx".
@@ -146,17 +164,10 @@ RESPONDE CON JSON VÁLIDO:
         "analisis_participantes": ""
     }}
 }}
-"""
+""")
 
 
-PROMPT_MGA_SUBSIDIOS_PAGINAS_6_11 = """
-
-DATOS DEL PROYECTO:
-Municipio: {municipio} | Departamento: {departamento}
-Proyecto: "{nombre_proyecto}"
-Valor: ${valor_total} COP
-Contexto POAI/Plan Desarrollo:
-{context_dump}
+PROMPT_MGA_SUBSIDIOS_PAGINAS_6_11 = _compact_json_skeleton("""
 
 **INSTRUCCIONES DE GENERACIÓN (IMPORTANTE):**
 1. ESTE DOCUMENTO ES PARA UN PROYECTO DE: "{nombre_proyecto}"
@@ -249,15 +260,9 @@ RESPONDE CON JSON VÁLIDO:
         }}
     }}
 }}
-"""
+""")
 
-PROMPT_MGA_SUBSIDIOS_PAGINAS_12_16 = """
-
-DATOS DEL PROYECTO:
-Proyecto: "{nombre_proyecto}"
-Valor Total: ${valor_total} COP
-Contexto:
-{context_dump}
+PROMPT_MGA_SUBSIDIOS_PAGINAS_12_16 = _compact_json_skeleton("""
 
 **INSTRUCCIONES:**
 1. NO uses datos de ejemplos (acueducto) a menos que sea relevante.
@@ -503,17 +508,11 @@ RESPONDE CON JSON VÁLIDO:
         "prestamos": []
     }}
 }}
-"""
+""")
 
-PROMPT_MGA_SUBSIDIOS_PAGINAS_17_21 = """
+PROMPT_MGA_SUBSIDIOS_PAGINAS_17_21 = _compact_json_skeleton("""
 Genera contenido para las PÁGINAS 17-21 del documento MGA.
 
-DATOS DEL PROYECTO:
-Proyecto: "{nombre_proyecto}"
-Valor Total: ${valor_total} COP
-Contexto:
-{context_dump}
-
 INSTRUCCIONES:
 1. Genera riesgos adicionales coherentes con el proyecto.
 2. Para beneficios, si es social, destaca la mejora en calidad de vida.
@@ -604,18 +603,11 @@ RESPONDE CON JSON VÁLIDO:
         "alcance": "Alcance definido para {nombre_proyecto} en {municipio}."
     }}
 }}
-"""
+""")
 
-PROMPT_MGA_SUBSIDIOS_PAGINAS_22_24 = """
+PROMPT_MGA_SUBSIDIOS_PAGINAS_22_24 = _compact_json_skeleton("""
 Genera contenido para las PÁGINAS FINALES del documento MGA (Indicadores).
 
-DATOS DEL PROYECTO:
-Municipio: {municipio} | Departamento: {departamento}
-Proyecto: "{nombre_proyecto}"
-Valor Total: ${valor_total} COP
-Contexto:
-{context_dump}
-
 **INSTRUCCIONES CLAVE - INDICADORES Y REGIONALIZACIÓN DINÁMICA:**
 1.  **GENERACIÓN DINÁMICA**: Debes generar UN (1) conjunto de datos POR CADA PRODUCTO definido en la cadena de valor.
     *   **Indicadores**: Genera un objeto en "indicadores_producto" por cada producto.
@@ -686,4 +678,4 @@ RESPONDE CON JSON VÁLIDO:
         }}
     ]
 }}
-"""
+""")
@@ -0,0 +1,36 @@
+"""
+Tests for the text compaction applied before AI extraction
+"""
+
+from extractors.document_data_extractor import PAGE_BREAK, _compact_text
+
+
+def test_compact_text_keeps_standalone_bpin_and_amount():
+    text = "Código BPIN\n2023000100123\nValor total\n1500000000\n"
+    compact = _compact_text(text)
+    assert "2023000100123" in compact.split("\n")
+    assert "1500000000" in compact.split("\n")
+
+
+def test_compact_text_keeps_short_form_values():
+    text = "Duración (días)\n365\nNúmero de beneficiarios\n850\nAplica\nSí"
+    assert _compact_text(text) == text
+
+
+def test_compact_text_keeps_short_values_inside_pages():
+    text = PAGE_BREAK.join([
+        "Objetivo del proyecto\nDuración (días)\n365\n1",
+        "2\nNúmero de beneficiarios\n850\nAlcance del proyecto\n2",
+    ])
+    assert _compact_text(text).split("\n") == [
+        "Objetivo del proyecto", "Duración (días)", "365",
+        "Número de beneficiarios", "850", "Alcance del proyecto",
+    ]
+
+
+def test_compact_text_drops_page_numbers():
+    text = PAGE_BREAK.join([
+        "Objetivo del proyecto\nPág 1",
+        "Página 3 de 12\nAlcance del proyecto\n3/12",
+    ])
+    assert _compact_text(text) == "Objetivo del proyecto\nAlcance del proyecto"